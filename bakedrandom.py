@@ -1,5 +1,52 @@
 import random
+import numpy as np
 
 seed = 1701204012222
 # seed = None
 brandom = random.Random(seed)
+
+
+class RandomStream(random.Random):
+
+    # A random.Random seeded from a numpy SeedSequence, with a numpy Generator
+    # on the same sequence for batch draws. spawn() derives independent child
+    # streams, so every island, restart or worker can own one and a run is
+    # reproducible from the root seed however the work is spread out.
+
+    def __init__(self, seed_sequence=None):
+        if not isinstance(seed_sequence, np.random.SeedSequence):
+            seed_sequence = np.random.SeedSequence(seed_sequence)
+        self.seed_sequence = seed_sequence
+        self.generator = np.random.Generator(np.random.PCG64(seed_sequence))
+        super(RandomStream, self).__init__(int.from_bytes(seed_sequence.generate_state(4).tobytes(), 'little'))
+
+    def spawn(self, n):
+        return [ RandomStream(child) for child in self.seed_sequence.spawn(n) ]
+
+    def getstate(self):
+        return super(RandomStream, self).getstate(), self.generator.bit_generator.state
+
+    def setstate(self, state):
+        python_state, generator_state = state
+        super(RandomStream, self).setstate(python_state)
+        self.generator.bit_generator.state = generator_state
+
+    def __reduce__(self):
+        return self.__class__, (self.seed_sequence,), self.getstate()
+
+    def __setstate__(self, state):
+        self.setstate(state)
+
+
+def random_array(rng, size):
+    # size draws of rng.random(); one numpy call on a RandomStream
+    if isinstance(rng, RandomStream):
+        return rng.generator.random(size)
+    return np.array([ rng.random() for i in range(size) ])
+
+
+def coin_flips(rng, size):
+    # size draws of rng.choice([False, True])
+    if isinstance(rng, RandomStream):
+        return rng.generator.random(size) < 0.5
+    return np.array([ rng.choice([False, True]) for i in range(size) ], dtype=bool)
@@ -1,35 +1,115 @@
+import math
 import numpy as np
 from core.opening import Window, Door
 
 
+class HalfEdge(object):
+
+    # One side of an Edge. The positive half runs p0 -> p1 around the positive
+    # room, the negative half runs p1 -> p0 around the negative room. Halves
+    # of the same room form a cycle through next/prev; outside halves have no
+    # room and are left unlinked.
+    __slots__ = ("edge", "twin", "face", "next", "prev")
+
+    def __init__(self, edge):
+        self.edge = edge
+        self.twin = None
+        self.face = None
+        self.next = None
+        self.prev = None
+
+    @property
+    def origin(self):
+        return self.edge.p0 if self is self.edge.half_positive else self.edge.p1
+
+    @property
+    def destination(self):
+        return self.edge.p1 if self is self.edge.half_positive else self.edge.p0
+
+    def link(self, other):
+        self.next = other
+        other.prev = self
+
+    def replace_with(self, first, second):
+        # Splice first -> second into this half's cycle in place of it
+        if self.face is None:
+            return
+
+        first.face = self.face
+        second.face = self.face
+        first.link(second)
+
+        self.prev.link(first)
+        second.link(self.next)
+        self.next = self.prev = None
+
+        self.face.half_edge_replaced(self, first)
+
+
 class Edge(object):
 
+    # Endpoints are fixed once an edge is created (subdividing produces new
+    # edges), so derived geometry is computed on first use and kept.
+    __slots__ = (
+        "p0", "p1",
+        "half_positive", "half_negative",
+        "doors", "windows",
+        "_points", "_unit_xy", "_length", "_orientation",
+    )
+
     def __init__(self, p0, p1):
         self.p0 = p0
         self.p1 = p1
 
-        self.negative = None
-        self.positive = None
+        self.half_positive = HalfEdge(self)
+        self.half_negative = HalfEdge(self)
+        self.half_positive.twin = self.half_negative
+        self.half_negative.twin = self.half_positive
 
         self.doors = []
         self.windows = []
 
+        self._points = None
+        self._unit_xy = None
+        self._length = None
+        self._orientation = None
+
+    @property
+    def positive(self):
+        return self.half_positive.face
+
+    @positive.setter
+    def positive(self, room):
+        self.half_positive.face = room
+
+    @property
+    def negative(self):
+        return self.half_negative.face
+
+    @negative.setter
+    def negative(self, room):
+        self.half_negative.face = room
+
+    def half_edge(self, room):
+        if room is self.half_positive.face:
+            return self.half_positive
+        if room is self.half_negative.face:
+            return self.half_negative
+        raise Exception("No half edge for requested room")
+
     @property
     def is_outside_edge(self):
         return self.negative is None or self.positive is None
 
     def subdivide(self, p):
-        dist, nearest = pnt2line(p, self.p0, self.p1)
+        dist, nearest = pnt2line_scalar(p, self.p0, self.p1)
         assert abs(dist) < 1e-4
 
         e0 = Edge(self.p0, p)
         e1 = Edge(p, self.p1)
 
-        e0.positive = self.positive
-        e1.positive = self.positive
-
-        e0.negative = self.negative
-        e1.negative = self.negative
+        self.half_positive.replace_with(e0.half_positive, e1.half_positive)
+        self.half_negative.replace_with(e1.half_negative, e0.half_negative)
 
         return e0, e1
 
@@ -50,6 +130,8 @@ class Edge(object):
             self.positive = new_room
         if self.negative is old_room:
             self.negative = new_room
+        if new_room is not None:
+            new_room.invalidate_geometry()
 
     def opposite_room(self, room):
         if self.positive is room:
@@ -59,7 +141,10 @@ class Edge(object):
         raise Exception("Invalid opposite room request")
 
     def interect_line(self, ro, rd):
-        return ray_line_intersect(ro, rd, self.p0, self.p1)
+        point, t = ray_line_intersect_scalar(ro, rd, self.p0, self.p1)
+        if point is None:
+            return None, None
+        return np.array(point, dtype=np.float32), t
 
     def insert_opening(self, opening):
         if isinstance(opening, Door):
@@ -74,9 +159,16 @@ class Edge(object):
 
     @property
     def unit_vector(self):
-        direction_vector = self.p1 - self.p0
-        direction_vector = direction_vector / np.linalg.norm(direction_vector)
-        return direction_vector
+        return np.array(self.unit_xy)
+
+    @property
+    def unit_xy(self):
+        if self._unit_xy is None:
+            x0, y0 = _xy(self.p0)
+            x1, y1 = _xy(self.p1)
+            length = self.length
+            self._unit_xy = (x1 - x0) / length, (y1 - y0) / length
+        return self._unit_xy
 
     def radial_points(self, t, radius):
         center = self.interpolate_at(t)
@@ -93,7 +185,9 @@ class Edge(object):
 
     @property
     def cartesian_points(self):
-        return self.p0.tolist(), self.p1.tolist()
+        if self._points is None:
+            self._points = tuple(self.p0.tolist()), tuple(self.p1.tolist())
+        return self._points
 
     @property
     def center(self):
@@ -105,14 +199,21 @@ class Edge(object):
 
     @property
     def orientation(self):
-        if abs(np.dot(self.unit_vector, Orientation.Vertical.to_unit_vector())) < 0.01:
-            return Orientation.Horizontal
-        else:
-            return Orientation.Vertical
+        if self._orientation is None:
+            ux, uy = self.unit_xy
+            if abs(uy) < 0.01:
+                self._orientation = Orientation.Horizontal
+            else:
+                self._orientation = Orientation.Vertical
+        return self._orientation
 
     @property
     def length(self):
-        return np.linalg.norm(self.p1 - self.p0)
+        if self._length is None:
+            x0, y0 = _xy(self.p0)
+            x1, y1 = _xy(self.p1)
+            self._length = math.sqrt((x1 - x0)**2 + (y1 - y0)**2)
+        return self._length
 
     def t_bounds(self, radius):
         length = self.length
@@ -218,6 +319,88 @@ def ray_line_intersect(rayOrigin, rayDirection, point1, point2):
     return None, None
 
 
+def ray_segments_intersect(rayOrigin, rayDirection, segments):
+    # Batched version of ray_line_intersect over an (N, 2, 2) array of
+    # segments. Returns the (N, 2) intersection points and the (N,) signed
+    # distances along the ray, with NaN wherever the ray misses a segment.
+
+    rayOrigin = np.asarray(rayOrigin, dtype=np.float32)
+    rayDirection = np.asarray(rayDirection, dtype=np.float32)
+    segments = np.asarray(segments, dtype=np.float32)
+
+    rayDirection = rayDirection / np.linalg.norm(rayDirection)
+    v1 = rayOrigin - segments[:, 0]
+    v2 = segments[:, 1] - segments[:, 0]
+    v3 = np.array([-rayDirection[1], rayDirection[0]])
+
+    d = v2[:, 0] * v3[0] + v2[:, 1] * v3[1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1 = (v2[:, 0] * v1[:, 1] - v2[:, 1] * v1[:, 0]) / d
+        t2 = (v1[:, 0] * v3[0] + v1[:, 1] * v3[1]) / d
+
+    hit = (d != 0) & (t2 >= 0.0) & (t2 <= 1.0)
+    t1 = np.where(hit, t1, np.nan).astype(np.float32)
+    return rayOrigin + t1[:, np.newaxis] * rayDirection, t1
+
+
+# Scalar versions of the kernels above for single-segment queries. Building
+# and dispatching on 2-element arrays costs far more than the arithmetic, so
+# these work on plain floats and return tuples instead of arrays.
+
+def _xy(p):
+    return float(p[0]), float(p[1])
+
+
+def cross_scalar(a, b):
+    ax, ay = _xy(a)
+    bx, by = _xy(b)
+    return ax * by - ay * bx
+
+
+def pnt2line_scalar(pnt, start, end):
+    px, py = _xy(pnt)
+    sx, sy = _xy(start)
+    ex, ey = _xy(end)
+
+    line_x, line_y = ex - sx, ey - sy
+    pnt_x, pnt_y = px - sx, py - sy
+
+    line_len = math.sqrt(line_x**2 + line_y**2)
+    t = (line_x / line_len) * (pnt_x / line_len) + (line_y / line_len) * (pnt_y / line_len)
+
+    if t < 0.0 or t > 1.0:
+        return None, None
+
+    nearest_x, nearest_y = line_x * t, line_y * t
+    dist = math.sqrt((nearest_x - pnt_x)**2 + (nearest_y - pnt_y)**2)
+    return dist, (sx + nearest_x, sy + nearest_y)
+
+
+def ray_line_intersect_scalar(rayOrigin, rayDirection, point1, point2):
+    ox, oy = _xy(rayOrigin)
+    dx, dy = _xy(rayDirection)
+    x1, y1 = _xy(point1)
+    x2, y2 = _xy(point2)
+
+    norm = math.sqrt(dx**2 + dy**2)
+    dx, dy = dx / norm, dy / norm
+    v1_x, v1_y = ox - x1, oy - y1
+    v2_x, v2_y = x2 - x1, y2 - y1
+
+    d = v2_x * -dy + v2_y * dx
+
+    if d == 0:
+        return None, None
+
+    t1 = (v2_x * v1_y - v2_y * v1_x) / d
+    t2 = (v1_x * -dy + v1_y * dx) / d
+
+    if t2 >= 0.0 and t2 <= 1.0:
+        return (ox + t1 * dx, oy + t1 * dy), t1
+    return None, None
+
+
 # Shamelessly taken from https://stackoverflow.com/questions/328107
 def is_on(a, b, c):
     "Return true iff point c intersects the line segment from a to b."
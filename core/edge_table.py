@@ -0,0 +1,58 @@
+import numpy as np
+from core.edge import Orientation
+
+
+class EdgeTable(object):
+
+    # Column view of the unique edges of a floor plan. Edge ids are the row
+    # indexes, which stay stable until the plan is subdivided again. The Edge
+    # objects remain the owners of doors and windows; the table only mirrors
+    # their geometry and room ids (-1 for the outside) for whole-plan queries.
+
+    def __init__(self, rooms):
+        room_ids = { room: i for i, room in enumerate(rooms) }
+
+        self.edges = []
+        self.index = {}
+        for room in rooms:
+            for edge in room.edges:
+                if edge in self.index:
+                    continue
+                self.index[edge] = len(self.edges)
+                self.edges.append(edge)
+
+        self.p0 = np.array([ e.cartesian_points[0] for e in self.edges ], dtype=np.float64).reshape(-1, 2)
+        self.p1 = np.array([ e.cartesian_points[1] for e in self.edges ], dtype=np.float64).reshape(-1, 2)
+        self.positive = np.array([ room_ids.get(e.positive, -1) for e in self.edges ], dtype=np.int32)
+        self.negative = np.array([ room_ids.get(e.negative, -1) for e in self.edges ], dtype=np.int32)
+        self.length = np.array([ e.length for e in self.edges ], dtype=np.float64)
+        self.is_vertical = np.array([ e.orientation == Orientation.Vertical for e in self.edges ], dtype=bool)
+
+    def __len__(self):
+        return len(self.edges)
+
+    def edge_id(self, edge):
+        return self.index[edge]
+
+    @property
+    def is_exterior(self):
+        return (self.positive < 0) | (self.negative < 0)
+
+    @property
+    def exterior_edge_ids(self):
+        return np.flatnonzero(self.is_exterior)
+
+    def door_eligible(self, radius):
+        # Same test as Edge.t_bounds returning bounds, for every edge at once
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ta = radius / self.length
+            tb = (self.length - radius) / self.length
+        return tb > ta
+
+    @property
+    def total_wall_length(self):
+        return float(self.length.sum())
+
+    @property
+    def door_counts(self):
+        return np.array([ len(e.doors) for e in self.edges ], dtype=np.int32)
@@ -2,12 +2,36 @@ import numpy as np
 from core.edge import Orientation
 from bakedrandom import brandom as random
 from core.opening import Door, DoorFactory
+from core.edge_table import EdgeTable
+from core.grid_index import RoomGridIndex
 
 class FloorPlan(object):
 
     def __init__(self, rooms, scale=1):
         self.rooms = rooms
         self.scale = scale
+        self._edge_table = None
+        self._grid_index = None
+
+    @property
+    def grid_index(self):
+        # Built on first point query, then kept up to date by replace_room
+        if self._grid_index is None:
+            self._grid_index = RoomGridIndex.for_rooms(self.rooms)
+        return self._grid_index
+
+    def locate(self, p):
+        return self.grid_index.locate(p)
+
+    def replace_room(self, room, new_rooms):
+        self.rooms.remove(room)
+        self.rooms.extend(new_rooms)
+        self._edge_table = None
+
+        if self._grid_index is not None:
+            self._grid_index.remove(room)
+            for new_room in new_rooms:
+                self._grid_index.insert(new_room)
 
     def subdivide(self, x, y, direction):
 
@@ -16,15 +40,11 @@ class FloorPlan(object):
 
         direction = direction.to_unit_vector()
 
-        success = False
-        for room in self.rooms:
-            if not room.contains(p):
-                continue
-            roomA, roomB = room.subdivide(p, direction)
-            self.rooms.remove(room)
-            self.rooms.append(roomA)
-            self.rooms.append(roomB)
-            break
+        room = self.locate(p)
+        if room is None:
+            return
+        roomA, roomB = room.subdivide(p, direction)
+        self.replace_room(room, [roomA, roomB])
 
     def proportional_subdivide(self, S, direction, room, hallway=False):
         if hallway:
@@ -33,45 +53,42 @@ class FloorPlan(object):
             roomA, roomB = room.proportional_subdivide(S, direction, hallway=hallway)
             roomHall = None
 
-        self.rooms.remove(room)
-        self.rooms.append(roomA)
-        self.rooms.append(roomB)
         if roomHall is not None:
-            self.rooms.append(roomHall)
+            self.replace_room(room, [roomA, roomB, roomHall])
             return roomA, roomB, roomHall
         else:
+            self.replace_room(room, [roomA, roomB])
             return roomA, roomB
 
+    @property
+    def edge_table(self):
+        if self._edge_table is None:
+            self._edge_table = EdgeTable(self.rooms)
+        return self._edge_table
+
     @property
     def edges(self):
-        edge_list = list()
-        edge_set = set()
-        for room in self.rooms:
-            for edge in room.edges:
-                if edge in edge_set:
-                    continue
-                edge_list.append(edge)
-                edge_set.add(edge)
-        return edge_list
+        return self.edge_table.edges
 
     def clear_doors(self):
         for room in self.rooms:
             for edge in room.edges:
                 edge.doors = []
 
-    def add_doors(self, door_vector):
-        edge_list = self.edges
+    def add_doors(self, door_vector, rng=None):
+        rng = rng or random
+        edge_table = self.edge_table
+        edge_list = edge_table.edges
 
         if len(door_vector) != len(edge_list):
             raise Exception("Differing length of door vector and edges")
 
-        for is_door, edge in zip(door_vector, edge_list):
-            if is_door:
+        eligible = edge_table.door_eligible(3.99)
+        for is_door, edge, can_have_door in zip(door_vector, edge_list, eligible):
+            if is_door and can_have_door:
                 a, b = edge.t_bounds(3.99)
-                if a is None:
-                    continue
 
-                side = random.choice([a, b])
+                side = rng.choice([a, b])
                 direction = -1
 
                 edge.doors.append(
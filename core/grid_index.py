@@ -0,0 +1,55 @@
+import math
+
+
+class RoomGridIndex(object):
+
+    # Uniform grid over room bounding boxes. Every cell keeps the rooms whose
+    # bounding box overlaps it, so locating a point only tests the handful of
+    # rooms in its cell instead of every room in the plan.
+
+    def __init__(self, x_min, y_min, cell_size):
+        self.x_min = x_min
+        self.y_min = y_min
+        self.cell_size = cell_size
+        self.cells = {}
+        self.room_cells = {}
+
+    @staticmethod
+    def for_rooms(rooms, cells_per_side=32):
+        x_max, x_min, y_max, y_min = float('-inf'), float('inf'), float('-inf'), float('inf')
+        for room in rooms:
+            r_x_max, r_x_min, r_y_max, r_y_min = room.max_min_xy
+            x_max, x_min = max(x_max, r_x_max), min(x_min, r_x_min)
+            y_max, y_min = max(y_max, r_y_max), min(y_min, r_y_min)
+
+        cell_size = max(x_max - x_min, y_max - y_min) / cells_per_side
+        index = RoomGridIndex(x_min, y_min, cell_size if cell_size > 0 else 1.0)
+        for room in rooms:
+            index.insert(room)
+        return index
+
+    def cell(self, x, y):
+        return (
+            int(math.floor((x - self.x_min) / self.cell_size)),
+            int(math.floor((y - self.y_min) / self.cell_size)),
+        )
+
+    def insert(self, room):
+        x_max, x_min, y_max, y_min = room.max_min_xy
+        i0, j0 = self.cell(x_min, y_min)
+        i1, j1 = self.cell(x_max, y_max)
+
+        keys = [ (i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1) ]
+        for key in keys:
+            self.cells.setdefault(key, []).append(room)
+        self.room_cells[room] = keys
+
+    def remove(self, room):
+        for key in self.room_cells.pop(room):
+            self.cells[key].remove(room)
+
+    def locate(self, p):
+        for room in self.cells.get(self.cell(p[0], p[1]), ()):
+            if room.contains(p):
+                return room
+        return None
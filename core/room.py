@@ -1,27 +1,100 @@
-from core.edge import Edge, Orientation, EdgeFactory
+from core.edge import Edge, Orientation, EdgeFactory, ray_segments_intersect
 
 import numpy as np
 
 class Room(object):
 
+    # A room is the cycle of half edges reachable from its head (see
+    # core.edge.HalfEdge). Derived geometry, including the edge list walked
+    # off that cycle, is cached and dropped whenever one of the room's half
+    # edges is split or handed over to it.
+    __slots__ = (
+        "_head", "groom",
+        "_edges", "_segments", "_signs", "_max_min_xy", "_area", "_perimeter",
+    )
+
     def __init__(self, edges):
         self.edges = edges
         self.groom = None
 
+    @classmethod
+    def from_half_edge(cls, head):
+        room = cls.__new__(cls)
+        room.groom = None
+        room._head = head
+        room.invalidate_geometry()
+        for half in room.half_edges:
+            half.face = room
+        return room
+
+    @property
+    def half_edges(self):
+        head = self._head
+        if head is None:
+            return
+        half = head
+        while True:
+            yield half
+            half = half.next
+            if half is head:
+                break
+
+    @property
+    def edges(self):
+        if self._edges is None:
+            self._edges = [half.edge for half in self.half_edges]
+        return self._edges
+
+    @edges.setter
+    def edges(self, edges):
+        # Edges are given in traversal order; the side of each edge that
+        # belongs to this room is the one that runs into the next edge.
+        halves = []
+        for i, edge in enumerate(edges):
+            next_points = edges[(i + 1) % len(edges)].cartesian_points
+            if len(edges) == 1 or edge.cartesian_points[1] in next_points:
+                halves.append(edge.half_positive)
+            else:
+                halves.append(edge.half_negative)
+
+        for half, next_half in zip(halves, halves[1:] + halves[:1]):
+            half.link(next_half)
+            half.face = self
+
+        self._head = halves[0] if halves else None
+        self.invalidate_geometry()
+
+    def half_edge_replaced(self, old, new):
+        if self._head is old:
+            self._head = new
+        self.invalidate_geometry()
+
+    def invalidate_geometry(self):
+        self._edges = None
+        self._segments = None
+        self._signs = None
+        self._max_min_xy = None
+        self._area = None
+        self._perimeter = None
+
     @property
     def area(self):
-        x = []
-        y = []
-        for edge in self.edges:
-            p = edge.p1_by_sign(self)
-            x.append(p[0])
-            y.append(p[1])
+        if self._area is None:
+            x = []
+            y = []
+            for edge in self.edges:
+                p = edge.p1_by_sign(self)
+                x.append(p[0])
+                y.append(p[1])
 
-        return 0.5*np.abs(np.dot(x,np.roll(y,1))-np.dot(y,np.roll(x,1)))
+            self._area = 0.5*np.abs(np.dot(x,np.roll(y,1))-np.dot(y,np.roll(x,1)))
+        return self._area
 
     @property
     def perimeter(self):
-        return sum([edge.length for edge in self.edges])
+        if self._perimeter is None:
+            self._perimeter = sum([edge.length for edge in self.edges])
+        return self._perimeter
 
     @property
     def min_aspect_ratio(self):
@@ -45,132 +118,93 @@ class Room(object):
 
 
     def subdivide_edge(self, close_edge):
-
+        # Returns the two edges meeting at the hit point, in this room's
+        # traversal order.
         if len(close_edge) == 1:
             original_edge = close_edge[0][0]
             subdivide_pt = close_edge[0][1]
             new_edges = original_edge.subdivide(subdivide_pt)
+            return list(new_edges[::original_edge.sign(self)])
 
-            original_edge_idx = self.edges.index(original_edge)
-
-            new_edges = list(new_edges[::original_edge.sign(self)])
-
-            neighbor_new_edges = new_edges[::-1]
-            neighbor = original_edge.opposite_room(self)
-            if neighbor is not None:
-                neighbor_original_edge_idx = neighbor.edges.index(original_edge)
-                neighbor.edges = neighbor.edges[:neighbor_original_edge_idx] + neighbor_new_edges + neighbor.edges[neighbor_original_edge_idx+1:]
-
-            self.edges = self.edges[:original_edge_idx] + new_edges + self.edges[original_edge_idx+1:]
-
-
-            for e in new_edges:
-                e.positive = original_edge.positive
-                e.negative = original_edge.negative
-        else:
-            e0 = close_edge[0][0]
-            e1 = close_edge[1][0]
-
-            idx0 = self.edges.index(e0)
-            idx1 = self.edges.index(e1)
-
-            # these were originally found in order
-            # idx0 whould be lower than idx1
-            # they should be neighbors, flip direction if on ends
-            assert idx0 < idx1
-            if idx0==0 and idx1==len(self.edges)-1:
-                new_edges = [e1,e0]
-            else:
-                new_edges = [e0,e1]
-
-        return new_edges
+        e0 = close_edge[0][0]
+        e1 = close_edge[1][0]
+        if e0.half_edge(self).next.edge is e1:
+            return [e0, e1]
+        return [e1, e0]
 
     def subdivide(self, p, direction):
         if not self.contains(p):
             raise InvalidSubdivisionException()
 
-        close_pos_distance = np.inf
-        close_pos_edge = []
-        close_neg_distance = -np.inf
-        close_neg_edge = []
-        for e in self.edges:
-
-            interect_pt, dis = e.interect_line(p, direction)
-            if dis is None:
-                continue
-            assert abs(dis) > 1e-8 #make sure we are not setting an edge on the line
-
-            if dis < 0:
-                if np.isclose(dis, close_neg_distance):
-                    close_neg_edge.append((e, interect_pt))
-                elif dis > close_neg_distance:
-                    close_neg_edge = [(e, interect_pt)]
-                    close_neg_distance = dis
-
-            if dis > 0:
-                if np.isclose(dis, close_pos_distance):
-                    close_pos_edge.append((e, interect_pt))
-                elif dis < close_pos_distance:
-                    close_pos_edge = [(e, interect_pt)]
-                    close_pos_distance = dis
+        points, distances = ray_segments_intersect(p, direction, self.edge_segments)
+        hits = ~np.isnan(distances)
+        assert np.all(np.abs(distances[hits]) > 1e-8) #make sure we are not setting an edge on the line
 
+        close_pos_edge = self.closest_hits(points, distances, hits & (distances > 0))
+        close_neg_edge = self.closest_hits(points, distances, hits & (distances < 0))
 
         pos_0, pos_1 = self.subdivide_edge(close_pos_edge)
         neg_0, neg_1 = self.subdivide_edge(close_neg_edge)
 
+        pos_in, pos_out = pos_0.half_edge(self), pos_1.half_edge(self)
+        neg_in, neg_out = neg_0.half_edge(self), neg_1.half_edge(self)
 
         p0 = pos_0.p1_by_sign(self)
         p1 = neg_0.p1_by_sign(self)
 
         new_edge = Edge(p0,p1)
 
-        pos_idx_0 = self.edges.index(pos_0)
-        pos_idx_1 = self.edges.index(pos_1)
-
-        neg_idx_0 = self.edges.index(neg_0)
-        neg_idx_1 = self.edges.index(neg_1)
-
-        if pos_idx_1 < neg_idx_0:
-            part0 = [new_edge] + self.edges[pos_idx_1:neg_idx_0+1]
-        else:
-            part0 = self.edges[:neg_idx_0+1] + [new_edge] + self.edges[pos_idx_1:]
-
-        if neg_idx_1 < pos_idx_0:
-            part1 = self.edges[neg_idx_1:pos_idx_0+1] + [new_edge]
-        else:
-            part1 = self.edges[:pos_idx_0+1] + [new_edge] + self.edges[neg_idx_1:]
+        # The new edge runs from the positive hit to the negative hit, so
+        # the room walking pos_in -> new edge -> neg_out is on its positive
+        # side, and the one walking neg_in -> new edge -> pos_out on its
+        # negative side.
+        pos_in.link(new_edge.half_positive)
+        new_edge.half_positive.link(neg_out)
+        neg_in.link(new_edge.half_negative)
+        new_edge.half_negative.link(pos_out)
+
+        room0 = Room.from_half_edge(new_edge.half_negative)
+        room1 = Room.from_half_edge(neg_out)
+
+        # Keep edge lists starting where this room's did, so edge (and door
+        # vector) ordering is unchanged by the split.
+        head = self._head
+        if head.face is room0 and head is not pos_out:
+            room0._head = head
+        if head.face is room1:
+            room1._head = head
+
+        self._head = None
+        self.invalidate_geometry()
 
-        room0 = Room(part0)
-        room1 = Room(part1)
-
-        # We use pos_1 because the edges will always be inserted
-        # after it. We could have used any of the split edges
-        v = pos_1.p1 - pos_1.p0
-        if pos_1.sign(self) * np.cross(p1-p0, v) > 0:
-            new_edge.positive = room0
-            new_edge.negative = room1
-        else:
-            new_edge.positive = room1
-            new_edge.negative = room0
+        return room0, room1
 
-        for e in part0:
-            e.replace_room(self, room0)
+    def closest_hits(self, points, distances, mask):
+        if not mask.any():
+            return []
+        closest = np.abs(distances[mask]).min()
+        close = mask & np.isclose(np.abs(distances), closest)
+        return [(self.edges[i], points[i]) for i in np.flatnonzero(close)]
 
-        for e in part1:
-            e.replace_room(self, room1)
+    def contains(self, p):
+        segments = self.edge_segments
+        v_edge = segments[:, 1] - segments[:, 0]
+        v_p = np.asarray(p) - segments[:, 0]
 
+        side = self.edge_signs * (v_edge[:, 0] * v_p[:, 1] - v_edge[:, 1] * v_p[:, 0])
+        return bool(np.all(side > 0))
 
-        return room0, room1
-
-    def contains(self, p):
-        for e in self.edges:
-            v_p = p - e.p0
-            v_edge = e.p1 - e.p0
+    @property
+    def edge_segments(self):
+        if self._segments is None:
+            self._segments = np.array([(e.p0, e.p1) for e in self.edges])
+        return self._segments
 
-            side = e.sign(self) * np.cross(v_edge, v_p)
-            if side <= 0:
-                return False
-        return True
+    @property
+    def edge_signs(self):
+        if self._signs is None:
+            self._signs = np.array([e.sign(self) for e in self.edges])
+        return self._signs
 
 
     @property
@@ -186,10 +220,8 @@ class Room(object):
 
     @property
     def all_neighbors_and_edges(self):
-        for edge in self.edges:
-            for room in [edge.positive, edge.negative]:
-                if room is not self:
-                    yield room, edge
+        for half in self.half_edges:
+            yield half.twin.face, half.edge
 
     def has_one_none_neighbor(self, orientation):
         count = 0
@@ -205,14 +237,16 @@ class Room(object):
 
     @property
     def max_min_xy(self):
-        x_max, x_min, y_max, y_min = float('-inf'), float('inf'), float('-inf'), float('inf')
-        for edge in self.edges:
-            for x, y in edge.cartesian_points:
-                x_max = max(x_max, x)
-                x_min = min(x_min, x)
-                y_max = max(y_max, y)
-                y_min = min(y_min, y)
-        return x_max, x_min, y_max, y_min
+        if self._max_min_xy is None:
+            x_max, x_min, y_max, y_min = float('-inf'), float('inf'), float('-inf'), float('inf')
+            for edge in self.edges:
+                for x, y in edge.cartesian_points:
+                    x_max = max(x_max, x)
+                    x_min = min(x_min, x)
+                    y_max = max(y_max, y)
+                    y_min = min(y_min, y)
+            self._max_min_xy = x_max, x_min, y_max, y_min
+        return self._max_min_xy
 
     def proportional_subdivide(self, S_area_percentage, orientation, hallway=False):
         x, y = self.center
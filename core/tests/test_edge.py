@@ -1,6 +1,8 @@
 import unittest
+import numpy as np
 from core.room import Room, RoomFactory
-from core.edge import Edge, EdgeFactory, Orientation
+from core.edge import Edge, EdgeFactory, Orientation, ray_line_intersect, ray_segments_intersect, \
+    ray_line_intersect_scalar, pnt2line, pnt2line_scalar
 
 class EdgeTestCases(unittest.TestCase):
 
@@ -32,3 +34,37 @@ class EdgeTestCases(unittest.TestCase):
         # ((10, 0), (10, 4))
         # ((10, 4), (10, 12))
         # ((10, 12), (0, 12))
+
+    def test_ray_segments_intersect_matches_single(self):
+        room = RoomFactory.Rectangle(10, 12)
+        origin = np.array([4, 5])
+
+        for direction in [np.array([0, 1]), np.array([1, 0]), np.array([1, 1])]:
+            points, distances = ray_segments_intersect(origin, direction, room.edge_segments)
+            for i, edge in enumerate(room.edges):
+                point, distance = ray_line_intersect(origin, direction, edge.p0, edge.p1)
+                if distance is None:
+                    self.assertTrue(np.isnan(distances[i]))
+                else:
+                    self.assertEqual(distance, distances[i])
+                    self.assertTrue(np.array_equal(point, points[i]))
+
+    def test_scalar_kernels_match_numpy(self):
+        start, end = np.array([0, 2]), np.array([10, 2])
+
+        dist, nearest = pnt2line(np.array([4, 2]), start, end)
+        dist_s, nearest_s = pnt2line_scalar(np.array([4, 2]), start, end)
+        self.assertEqual(dist, dist_s)
+        self.assertEqual(nearest.tolist(), list(nearest_s))
+
+        for direction in [np.array([0, 1]), np.array([0, -1]), np.array([1, 0])]:
+            point, t = ray_line_intersect(np.array([4, 5]), direction, start, end)
+            point_s, t_s = ray_line_intersect_scalar(np.array([4, 5]), direction, start, end)
+            self.assertEqual(t, t_s)
+            if point is not None:
+                self.assertEqual(point.tolist(), list(point_s))
+
+        edge = Edge(start, end)
+        self.assertEqual(edge.length, np.linalg.norm(end - start))
+        self.assertEqual(edge.orientation, Orientation.Horizontal)
+        self.assertEqual(Edge(start, np.array([0, 7])).orientation, Orientation.Vertical)
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+from core.edge import Orientation
+from core.floorplan import FloorPlan
+from core.room import RoomFactory
+
+
+class FloorPlanTestCase(unittest.TestCase):
+
+    def create_floorplan(self):
+        fp = FloorPlan([RoomFactory.Rectangle(12, 10)])
+        fp.subdivide(6, 5, Orientation.Vertical)
+        fp.subdivide(3, 4, Orientation.Horizontal)
+        return fp
+
+    def test_edge_table_matches_rooms(self):
+        fp = self.create_floorplan()
+        table = fp.edge_table
+
+        unique_edges = set(e for room in fp.rooms for e in room.edges)
+        self.assertEqual(len(table), len(unique_edges))
+        self.assertEqual(set(table.edges), unique_edges)
+
+        for i, edge in enumerate(table.edges):
+            self.assertEqual(table.edge_id(edge), i)
+            self.assertEqual(table.length[i], edge.length)
+            self.assertEqual(table.is_exterior[i], edge.is_outside_edge)
+            self.assertEqual(table.door_eligible(3.99)[i], edge.t_bounds(3.99)[0] is not None)
+
+        self.assertEqual(table.total_wall_length, 12 * 2 + 10 * 2 + 10 + 6)
+
+    def test_edge_table_rebuilt_after_subdivide(self):
+        fp = self.create_floorplan()
+        before = fp.edge_table
+        self.assertIs(before, fp.edge_table)
+
+        fp.subdivide(9, 2, Orientation.Horizontal)
+        self.assertIsNot(before, fp.edge_table)
+        self.assertEqual(len(fp.edges), len(before) + 3)
+        self.assertTrue(np.all(fp.edge_table.positive[fp.edge_table.positive >= 0] < len(fp.rooms)))
+
+    def test_locate_matches_linear_scan(self):
+        fp = self.create_floorplan()
+        for x, y in [(9, 2), (2, 8), (4, 2), (10, 9)]:
+            fp.subdivide(x, y, Orientation.Vertical if x % 2 else Orientation.Horizontal)
+
+        for x in range(0, 13):
+            for y in range(0, 11):
+                p = np.array([x + 0.5, y + 0.25])
+                expected = [room for room in fp.rooms if room.contains(p)]
+                located = fp.locate(p)
+                self.assertEqual(expected, [located] if located is not None else [])
+
+        self.assertIsNone(fp.locate(np.array([20, 20])))
@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 from core.edge import Edge, EdgeFactory, Orientation
 from core.room import Room, RoomFactory
 
@@ -73,3 +74,36 @@ class RoomTestCase(unittest.TestCase):
     def test_center_point(self):
         room = RoomFactory.Rectangle(14, 16)
         self.assertTrue(room.center == (7.0, 8.0))
+
+    def test_cached_geometry_follows_neighbor_split(self):
+        room = RoomFactory.Rectangle(12, 10)
+        roomA, roomB = room.subdivide(np.array([6, 5]), Orientation.Vertical.to_unit_vector())
+
+        self.assertEqual(len(roomB.edge_segments), 4)
+        self.assertEqual(roomB.width * roomB.height, roomB.area)
+
+        roomA.subdivide(np.array([3, 4]), Orientation.Horizontal.to_unit_vector())
+
+        self.assertEqual(len(roomB.edges), 5)
+        self.assertEqual(len(roomB.edge_segments), 5)
+        self.assertEqual(roomB.area, 60)
+        self.assertFalse(hasattr(roomB, "__dict__"))
+        self.assertFalse(hasattr(roomB.edges[0], "__dict__"))
+
+    def test_half_edge_cycles_after_subdivide(self):
+        room = RoomFactory.Rectangle(12, 10)
+        roomA, roomB = room.subdivide(np.array([6, 5]), Orientation.Vertical.to_unit_vector())
+        roomC, roomD = roomA.subdivide(np.array([3, 4]), Orientation.Horizontal.to_unit_vector())
+
+        for r in [roomB, roomC, roomD]:
+            halves = list(r.half_edges)
+            self.assertEqual([h.edge for h in halves], r.edges)
+            for half in halves:
+                self.assertIs(half.face, r)
+                self.assertIs(half.next.prev, half)
+                self.assertEqual(list(half.destination), list(half.next.origin))
+
+        self.assertEqual(set(roomB.neighbors), set([roomC, roomD]))
+        self.assertEqual(set(roomC.neighbors), set([roomB, roomD]))
+        for neighbor, edge in roomB.all_neighbors_and_edges:
+            self.assertIs(edge.opposite_room(roomB), neighbor)
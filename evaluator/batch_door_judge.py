@@ -0,0 +1,136 @@
+import numpy as np
+import scipy.sparse
+import scipy.sparse.csgraph
+
+from generator.batch_evaluator import GroomKinds, groom_kind
+from generator.groom import BathGroom, BedGroom, DiningGroom, KitchenGroom
+
+
+class BatchDoorJudge(object):
+
+    # DoorJudge scores for a whole door population at once. A population is a
+    # (candidates x edges) matrix of door vectors; add_doors only puts a door
+    # on eligible edges, so doors = vectors & eligible. Each room's edges are
+    # worked out once per plan, and scores match score_connectivity() +
+    # score_individual_doors() on the plan with each vector's doors added.
+
+    def __init__(self, fp):
+        edge_table = fp.edge_table
+        self.num_rooms = len(fp.rooms)
+        self.num_edges = len(edge_table)
+        self.eligible = edge_table.door_eligible(3.99)
+        self.exterior = edge_table.is_exterior
+
+        # Edges between two rooms, for the connectivity graph
+        interior = np.flatnonzero(~self.exterior)
+        self.interior_edges = interior
+        self.interior_a = edge_table.positive[interior]
+        self.interior_b = edge_table.negative[interior]
+
+        # Per room door_score rule: 'constant' rooms score their value, 'shy'
+        # rooms score 0 with an outside door and 1 otherwise, bed and bath
+        # rooms count their doors. Rules read a room's own edges, its local
+        # columns, in all_neighbors_and_edges order.
+        self.room_edges = []
+        self.room_exterior = []
+        self.rules = []
+        for r, room in enumerate(fp.rooms):
+            edges = []
+            neighbors = []
+            for neighbor, edge in room.all_neighbors_and_edges:
+                neighbors.append((neighbor, len(edges)))
+                edges.append(edge_table.edge_id(edge))
+            self.room_edges.append(np.array(edges, dtype=np.intp))
+            self.room_exterior.append(np.array([ neighbor is None for neighbor, c in neighbors ], dtype=bool))
+            self.rules.append(self.door_rule(room.groom, neighbors))
+
+    @staticmethod
+    def door_rule(groom, neighbors):
+        # Exact type, as for batched tree scores; a groom type without a
+        # rule here raises rather than being scored as some other type
+        kind = groom_kind(groom)
+        if kind == GroomKinds.Jilted:
+            return ('constant', 0.0)
+        if kind == GroomKinds.Hallway:
+            return ('constant', 1)
+        if kind in (GroomKinds.Living, GroomKinds.Custom):
+            return ('constant', 1.0)
+        if kind in (GroomKinds.Generic, GroomKinds.Dining, GroomKinds.Kitchen):
+            return ('shy', None)
+        if kind == GroomKinds.Bath:
+            return ('bath', None)
+        if kind == GroomKinds.Bed:
+            # Doors to bathrooms don't count; the last counted door to a
+            # bed, kitchen or dining room decides the multiplier
+            counted = []
+            multipliers = []
+            for neighbor, c in neighbors:
+                if neighbor is None or type(neighbor.groom) is BathGroom:
+                    continue
+                counted.append(c)
+                if type(neighbor.groom) is BedGroom:
+                    multipliers.append((c, 0.1))
+                elif type(neighbor.groom) in (KitchenGroom, DiningGroom):
+                    multipliers.append((c, 0.5))
+            return ('bed', (np.array(counted, dtype=np.intp), multipliers))
+        raise ValueError("No batched door scoring for groom type {}".format(type(groom).__name__))
+
+    def doors(self, vectors):
+        return np.asarray(vectors, dtype=bool).reshape(-1, self.num_edges) & self.eligible
+
+    def score_vectors(self, vectors):
+        connectivity, door = self.score_parts(self.doors(vectors))
+        return connectivity + door
+
+    def score_parts(self, doors):
+        return self.score_connectivity(doors), self.score_individual_doors(doors)
+
+    def score_connectivity(self, doors):
+        num_candidates = len(doors)
+        R = self.num_rooms
+
+        # One graph of all candidates' rooms, with an edge for every door
+        # between two rooms
+        candidate, slot = np.nonzero(doors[:, self.interior_edges])
+        graph = scipy.sparse.coo_matrix(
+            (np.ones(len(slot)), (candidate * R + self.interior_a[slot], candidate * R + self.interior_b[slot])),
+            shape=(num_candidates * R, num_candidates * R),
+        )
+        num_components, labels = scipy.sparse.csgraph.connected_components(graph, directed=False)
+        sizes = np.bincount(labels, minlength=num_components)
+        largest_island = sizes[labels].reshape(num_candidates, R).max(axis=1)
+
+        connectivity_score = (largest_island / R) ** 2
+        outside_door = doors[:, self.exterior].any(axis=1)
+        return connectivity_score * np.where(outside_door, 1.0, 0.5)
+
+    def room_scores(self, r, local_doors):
+        # door_score of room r for each row of doors on its local columns
+        rule, data = self.rules[r]
+        n = len(local_doors)
+        if rule == 'constant':
+            return np.full(n, float(data))
+
+        outside = local_doors[:, self.room_exterior[r]].any(axis=1)
+        if rule == 'shy':
+            return np.where(outside, 0.0, 1.0)
+        if rule == 'bath':
+            counts = local_doors.sum(axis=1)
+            multiplier = np.where(outside, 0.25, 1.0)
+            return np.where(counts > 0, multiplier / np.maximum(counts, 1), 0.0)
+
+        counted, multipliers = data
+        door_counter = local_doors[:, counted].sum(axis=1)
+        multiplier = np.ones(n)
+        for c, value in multipliers:
+            multiplier = np.where(local_doors[:, c], value, multiplier)
+        room_score = np.where(door_counter > 0, multiplier / np.maximum(door_counter, 1), 0.0)
+        return np.where(outside, 0.0, room_score)
+
+    def score_individual_doors(self, doors):
+        # Rooms are summed in order, as DoorJudge does
+        door_score = np.zeros(len(doors))
+        for r, edges in enumerate(self.room_edges):
+            door_score += self.room_scores(r, doors[:, edges]) ** 2
+
+        return door_score / self.num_rooms
@@ -0,0 +1,214 @@
+from collections import deque
+from recordclass import recordclass
+import numpy as np
+
+from evaluator.batch_door_judge import BatchDoorJudge
+from evaluator.union_find import RoomUnionFind
+
+
+OffEdges = recordclass("OffEdges", [
+    "a",
+    "b",
+    "exterior",
+    "exterior_on"
+])
+
+
+class DoorOptimizer(object):
+
+    # Door vector search for create_perfect_doorplan's objective,
+    # score_individual_doors + score_connectivity ** 2. Connectivity wants a
+    # spanning tree of doors over the room adjacency graph, so the search
+    # starts from breadth-first spanning trees rooted at up to max_starts
+    # rooms. Each start is then hill-climbed over single door flips and moves
+    # of a door to another edge, taking the best improvement until none is
+    # left. Moves are not built as door vectors: a flip only changes the
+    # door_score of the one or two rooms on its edge, so door scores come from
+    # per-edge deltas, and islands come from a RoomUnionFind of the doors
+    # with each one taken out in turn.
+
+    def __init__(self, fp, max_starts=16):
+        self.judge = BatchDoorJudge(fp)
+        self.num_rooms = self.judge.num_rooms
+        self.max_starts = max_starts
+        self.eligible_edges = np.flatnonzero(self.judge.eligible)
+
+        self.adjacency = [ [] for r in range(self.num_rooms) ]
+        self.ends = {}
+        for e, a, b in zip(self.judge.interior_edges, self.judge.interior_a, self.judge.interior_b):
+            if self.judge.eligible[e]:
+                self.adjacency[a].append((b, e))
+                self.adjacency[b].append((a, e))
+                self.ends[e] = (a, b)
+
+        # (room, local column) of every edge, for the door score deltas
+        self.edge_rooms = [ [] for e in range(self.judge.num_edges) ]
+        for r, edges in enumerate(self.judge.room_edges):
+            for c, e in enumerate(edges):
+                self.edge_rooms[e].append((r, c))
+
+    def objective(self, doors):
+        connectivity, door = self.judge.score_parts(doors)
+        return door + connectivity ** 2
+
+    def spanning_tree(self, root):
+        doors = np.zeros(self.judge.num_edges, dtype=bool)
+        visited = set([root])
+        queue = deque([root])
+        while queue:
+            room = queue.popleft()
+            for neighbor, e in self.adjacency[room]:
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    doors[e] = True
+                    queue.append(neighbor)
+        return doors
+
+    def door_deltas(self, doors, on, off):
+        # Change in door score for flipping each eligible edge, and for each
+        # move of a door from an edge in on to an edge in off
+        R = self.num_rooms
+        eligible = self.judge.eligible
+        flip = np.zeros(self.judge.num_edges)
+        move = np.zeros((len(on), len(off)))
+        on_index = np.full(self.judge.num_edges, -1)
+        on_index[on] = np.arange(len(on))
+        off_index = np.full(self.judge.num_edges, -1)
+        off_index[off] = np.arange(len(off))
+
+        for r, edges in enumerate(self.judge.room_edges):
+            local = doors[edges]
+            old = self.judge.room_scores(r, local[None])[0] ** 2
+            cols = np.flatnonzero(eligible[edges])
+            if not len(cols):
+                continue
+            rows = np.repeat(local[None], len(cols), axis=0)
+            rows[np.arange(len(cols)), cols] ^= True
+            delta = self.judge.room_scores(r, rows) ** 2 - old
+            flip[edges[cols]] += delta
+
+            # Moves within the room are scored jointly, replacing the two
+            # flips' deltas for this room
+            on_cols = cols[local[cols]]
+            off_cols = cols[~local[cols]]
+            if not len(on_cols) or not len(off_cols):
+                continue
+            rows = np.repeat(local[None], len(on_cols) * len(off_cols), axis=0)
+            rows[np.arange(len(rows)), np.repeat(on_cols, len(off_cols))] = False
+            rows[np.arange(len(rows)), np.tile(off_cols, len(on_cols))] = True
+            joint = (self.judge.room_scores(r, rows) ** 2 - old).reshape(len(on_cols), len(off_cols))
+            delta_of = dict(zip(cols, delta))
+            joint -= np.array([ delta_of[c] for c in on_cols ])[:, None]
+            joint -= np.array([ delta_of[c] for c in off_cols ])[None, :]
+            move[np.ix_(on_index[edges[on_cols]], off_index[edges[off_cols]])] += joint
+
+        move += flip[on][:, None] + flip[off][None, :]
+        return flip / R, move / R
+
+    def connectivity(self, largest, outside):
+        return (largest / self.num_rooms) ** 2 * np.where(outside, 1.0, 0.5)
+
+    def island_sizes(self, forest, a, b):
+        # Largest island of the forest with a door joining each a[i] and b[i]
+        parent = np.array(forest.parent)
+        while True:
+            grandparent = parent[parent]
+            if (grandparent == parent).all():
+                break
+            parent = grandparent
+        size = np.array(forest.size)
+
+        merged = np.where(parent[a] != parent[b], size[parent[a]] + size[parent[b]], size[parent[a]])
+        return np.maximum(forest.largest, merged)
+
+    def moves_without(self, forest, on, i, j, off, scores):
+        # Connectivity of taking each door in on[i:j] out of the plan, on its
+        # own and moved to each edge in off. The forest holds every interior
+        # door outside on[i:j]; mark() and rollback() add the other half on
+        # the way down.
+        if j - i == 1:
+            outside_left = off.exterior_on - (on[i] not in self.ends)
+            scores[i, 0] = self.connectivity(forest.largest, outside_left > 0)
+            largest = np.where(off.exterior, forest.largest, self.island_sizes(forest, off.a, off.b))
+            scores[i, 1:] = self.connectivity(largest, outside_left + off.exterior > 0)
+            return
+
+        middle = (i + j) // 2
+        for (lo, hi), (add_lo, add_hi) in [((i, middle), (middle, j)), ((middle, j), (i, middle))]:
+            mark = forest.mark()
+            for e in on[add_lo:add_hi]:
+                if e in self.ends:
+                    forest.union(*self.ends[e])
+            self.moves_without(forest, on, lo, hi, off, scores)
+            forest.rollback(mark)
+
+    def best_step(self, doors):
+        # Best (predicted score, doors) one flip or move away
+        edges = self.eligible_edges
+        on = edges[doors[edges]]
+        off = edges[~doors[edges]]
+        door = self.judge.score_individual_doors(doors[None])[0]
+        flip, move = self.door_deltas(doors, on, off)
+
+        # Rooms on either side of each off edge; exterior edges join a room
+        # to itself
+        ends = np.array([ self.ends.get(e, (0, 0)) for e in off ], dtype=np.intp).reshape(-1, 2)
+        targets = OffEdges(
+            a=ends[:, 0],
+            b=ends[:, 1],
+            exterior=np.array([ e not in self.ends for e in off ], dtype=bool),
+            exterior_on=sum(e not in self.ends for e in on),
+        )
+
+        # Adding a door: largest island with it, from the forest of all doors
+        forest = RoomUnionFind(self.num_rooms)
+        for e in on:
+            if e in self.ends:
+                forest.union(*self.ends[e])
+        largest = np.array([ forest.largest_with(*self.ends[e]) if e in self.ends else forest.largest for e in off ])
+        add = door + flip[off] + self.connectivity(largest, (targets.exterior_on > 0) | targets.exterior) ** 2
+
+        # Taking a door out, or moving it: column 0 is the bare removal
+        connectivity = np.zeros((len(on), len(off) + 1))
+        if len(on):
+            self.moves_without(RoomUnionFind(self.num_rooms), on, 0, len(on), targets, connectivity)
+        remove = door + flip[on] + connectivity[:, 0] ** 2
+        moved = door + move + connectivity[:, 1:] ** 2
+
+        best_score, best_doors = float('-inf'), None
+        for scores, changes in [(add, lambda k: [off[k]]), (remove, lambda k: [on[k]]), (moved, lambda k: [on[k // len(off)], off[k % len(off)]])]:
+            if scores.size and scores.max() > best_score:
+                k = int(np.argmax(scores))
+                best_score = scores.flat[k]
+                best_doors = doors.copy()
+                best_doors[changes(k)] ^= True
+        return best_score, best_doors
+
+    def improve(self, doors):
+        score = self.objective(doors[None])[0]
+        while len(self.eligible_edges):
+            predicted, candidate = self.best_step(doors)
+            if candidate is None:
+                break
+            # Deltas only rank the steps; the plan's score is recomputed
+            candidate_score = self.objective(candidate[None])[0]
+            if candidate_score <= score:
+                break
+            doors, score = candidate, candidate_score
+        return doors, score
+
+    def optimize(self):
+        best_doors, best_score = None, float('-inf')
+        starts = set()
+        roots = np.unique(np.linspace(0, self.num_rooms - 1, min(self.num_rooms, self.max_starts)).astype(int))
+        for root in roots:
+            start = self.spanning_tree(root)
+            if start.tobytes() in starts:
+                continue
+            starts.add(start.tobytes())
+
+            doors, score = self.improve(start)
+            if score > best_score:
+                best_doors, best_score = doors, score
+
+        return [ int(is_door) for is_door in best_doors ]
@@ -0,0 +1,56 @@
+class RoomUnionFind(object):
+
+    # Islands of rooms joined by doors. Union by size without path
+    # compression keeps find() at O(log rooms) and makes every union
+    # undoable: mark() before trying doors, rollback(mark) to take them out.
+
+    def __init__(self, num_rooms):
+        self.parent = list(range(num_rooms))
+        self.size = [1] * num_rooms
+        self.largest = 1 if num_rooms else 0
+        self.history = []
+
+    def find(self, room):
+        while self.parent[room] != room:
+            room = self.parent[room]
+        return room
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            self.history.append(None)
+            return False
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.history.append((a, b, self.largest))
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        self.largest = max(self.largest, self.size[a])
+        return True
+
+    def mark(self):
+        return len(self.history)
+
+    def rollback(self, mark):
+        while len(self.history) > mark:
+            entry = self.history.pop()
+            if entry is None:
+                continue
+            a, b, largest = entry
+            self.parent[b] = b
+            self.size[a] -= self.size[b]
+            self.largest = largest
+
+    def largest_with(self, a, b):
+        # Largest island if a door joined rooms a and b
+        mark = self.mark()
+        self.union(a, b)
+        largest = self.largest
+        self.rollback(mark)
+        return largest
+
+    def islands(self):
+        islands = {}
+        for room in range(len(self.parent)):
+            islands.setdefault(self.find(room), []).append(room)
+        return list(islands.values())
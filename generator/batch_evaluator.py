@@ -0,0 +1,389 @@
+import math
+import numpy as np
+
+from core.edge import Orientation
+from core.room import InvalidSubdivisionException
+from generator.groom import *
+
+
+class GroomKinds:
+    Empty, Generic, Jilted, Living, Custom, Dining, Kitchen, Hallway, Bed, Bath = range(10)
+
+
+GROOM_KINDS = {
+    Groom: GroomKinds.Generic,
+    JiltedGroom: GroomKinds.Jilted,
+    LivingGroom: GroomKinds.Living,
+    CustomGroom: GroomKinds.Custom,
+    DiningGroom: GroomKinds.Dining,
+    KitchenGroom: GroomKinds.Kitchen,
+    HallwayGroom: GroomKinds.Hallway,
+    BedGroom: GroomKinds.Bed,
+    BathGroom: GroomKinds.Bath,
+}
+
+
+def groom_kind(groom):
+    # Exact type, the same way the grooms compare each other
+    try:
+        return GROOM_KINDS[type(groom)]
+    except KeyError:
+        raise ValueError("No batched scoring for groom type {}".format(type(groom).__name__))
+
+
+def groom_kinds(groom_types):
+    return [ GROOM_KINDS[groom_type] for groom_type in groom_types ]
+
+
+def apply_scores(node_lists, scores, node_scores):
+    for nodes, score, row in zip(node_lists, scores.tolist(), node_scores.tolist()):
+        for node, node_score in zip(nodes, row):
+            if not math.isnan(node_score):
+                node.score = node_score
+        # The root node is the candidate, its score is the plan score
+        nodes[0].score = score
+
+
+class TreeTopology(object):
+
+    # The shape shared by every tree in a GA population: preorder node
+    # indexes, parent/child links, subtree sizes, the room of every leaf and
+    # the room area under each child. Every internal node also gets a slot
+    # for the hallway it may carve out, numbered after the nodes.
+
+    def __init__(self, rootnode, list_o_rooms):
+        nodes = TreeTopology.preorder(rootnode)
+        index = { id(node): i for i, node in enumerate(nodes) }
+
+        num_nodes = len(nodes)
+        self.parent = np.full(num_nodes, -1, dtype=np.int64)
+        self.children = np.full((num_nodes, 2), -1, dtype=np.int64)
+        self.size = np.ones(num_nodes, dtype=np.int64)
+        self.room_index = np.full(num_nodes, -1, dtype=np.int64)
+        self.area = np.zeros(num_nodes)
+        self.hall_slot = np.full(num_nodes, -1, dtype=np.int64)
+
+        self.room_indexes = [ tuple(node.room_indexes) for node in nodes ]
+        for i, node in enumerate(nodes):
+            self.area[i] = sum([ list_o_rooms[r].area for r in node.room_indexes ])
+            if len(node.children) <= 1:
+                self.room_index[i] = node.room_indexes[0]
+                continue
+            for c, child in enumerate(node.children[:2]):
+                self.children[i, c] = index[id(child)]
+                self.parent[index[id(child)]] = i
+
+        for i in reversed(range(num_nodes)):
+            if self.children[i, 0] >= 0:
+                self.size[i] = 1 + self.size[self.children[i, 0]] + self.size[self.children[i, 1]]
+
+        self.internal = np.flatnonzero(self.children[:, 0] >= 0)
+        self.leaves = np.flatnonzero(self.children[:, 0] < 0)
+        self.hall_slot[self.internal] = num_nodes + np.arange(len(self.internal))
+        self.num_nodes = num_nodes
+        self.num_slots = num_nodes + len(self.internal)
+        # Identifies the shape and room assignment, e.g. in cache keys
+        self.key = (self.children.tobytes(), tuple(self.room_indexes))
+
+    @staticmethod
+    def preorder(node):
+        nodes = [node]
+        for child in node.children:
+            nodes.extend(TreeTopology.preorder(child))
+        return nodes
+
+    def encode(self, trees):
+        return self.encode_nodes([ TreeTopology.preorder(tree) for tree in trees ])
+
+    def encode_nodes(self, node_lists):
+        # One row per tree, one column per preorder node
+        num_trees = len(node_lists)
+        vertical = np.zeros((num_trees, self.num_nodes), dtype=bool)
+        order = np.ones((num_trees, self.num_nodes), dtype=np.int64)
+        padding = np.zeros((num_trees, self.num_nodes), dtype=bool)
+        t = np.zeros((num_trees, self.num_nodes))
+
+        for row, nodes in enumerate(node_lists):
+            if len(nodes) != self.num_nodes:
+                raise ValueError("Tree does not match the population topology")
+            vertical[row] = [ node.orientation == Orientation.Vertical for node in nodes ]
+            order[row] = [ node.order for node in nodes ]
+            padding[row] = [ bool(node.padding) for node in nodes ]
+            t[row] = [ node.t for node in nodes ]
+
+        return vertical, order, padding, t
+
+
+class BatchTreeEvaluator(object):
+
+    # Instantiates and scores a whole population of same-shaped trees at
+    # once. Rectangles follow RectangleTreeToFloorplan and scores follow
+    # FloorplanEvaluator.score_floorplan, including the leaf node scores
+    # subdivide_room records while the plan is only partly subdivided.
+
+    HALLWAY_WIDTH = 8
+
+    def __init__(self, lot_width, lot_height, list_o_rooms, weights):
+        self.lot_width = lot_width
+        self.lot_height = lot_height
+        self.list_o_rooms = list_o_rooms
+        self.weights = weights
+        self.room_kinds = np.array([ groom_kind(groom) for groom in list_o_rooms ], dtype=np.int64)
+        # A groom of every kind, for its tree_weight and score_tree_features
+        self.kind_grooms = { GroomKinds.Hallway: HallwayGroom(), GroomKinds.Jilted: JiltedGroom() }
+        for groom, kind in zip(list_o_rooms, self.room_kinds.tolist()):
+            self.kind_grooms.setdefault(kind, groom)
+
+    def score_population(self, trees, topology=None):
+        # Returns the floor plan score of every tree and a (trees x nodes)
+        # array of node scores, NaN where subdivide_room leaves a node alone.
+        topology = topology or TreeTopology(trees[0], self.list_o_rooms)
+        return self.score_arrays(topology, *topology.encode(trees))
+
+    def score_candidates(self, trees, topology=None):
+        # Same effect as instantiating and scoring every tree in turn
+        topology = topology or TreeTopology(trees[0], self.list_o_rooms)
+        node_lists = [ TreeTopology.preorder(tree) for tree in trees ]
+        scores, node_scores = self.score_arrays(topology, *topology.encode_nodes(node_lists))
+        apply_scores(node_lists, scores, node_scores)
+        return scores
+
+    def score_arrays(self, topology, vertical, order, padding, t):
+        layout = self.instantiate(topology, vertical, order, padding, t)
+        node_scores = self.node_scores(topology, layout)
+        scores = self.plan_scores(topology, layout)
+        return scores, node_scores
+
+    def instantiate(self, topology, vertical, order, padding, t):
+        num_trees = vertical.shape[0]
+        rows = np.arange(num_trees)
+        num_slots = topology.num_slots
+
+        x0, y0, x1, y1 = [ np.full((num_trees, num_slots), np.nan) for i in range(4) ]
+        exists = np.zeros((num_trees, num_slots), dtype=bool)
+        jilted = np.zeros((num_trees, topology.num_nodes), dtype=bool)
+        visit = np.zeros((num_trees, topology.num_nodes), dtype=np.int64)
+        # Position of each room in FloorPlan.rooms is given by when it was
+        # appended: its parent's visit time, then A, B, hallway.
+        append_key = np.full((num_trees, num_slots), -1, dtype=np.int64)
+
+        x0[:, 0], y0[:, 0], x1[:, 0], y1[:, 0] = 0, 0, self.lot_width, self.lot_height
+        exists[:, 0] = True
+
+        for i in topology.internal:
+            c0, c1 = topology.children[i]
+            swap = order[:, i] < 0
+            first = np.where(swap, c1, c0)
+            second = np.where(swap, c0, c1)
+
+            visit[rows, first] = visit[:, i] + 1
+            visit[rows, second] = visit[:, i] + 1 + topology.size[first]
+
+            live = exists[:, i]
+            if not live.any():
+                continue
+
+            a1 = topology.area[first]
+            a2 = topology.area[second]
+            tt = t[:, i]
+            S = (a1 * (1 - tt)) / (a1 * (1 - tt) + a2 * tt)
+
+            rx0, ry0, rx1, ry1 = x0[:, i], y0[:, i], x1[:, i], y1[:, i]
+            is_vertical = vertical[:, i]
+            hallway = padding[:, i] & (np.minimum(rx1 - rx0, ry1 - ry0) >= 21)
+
+            x = np.where(is_vertical, (1 - S) * rx0 + S * rx1, (rx1 + rx0) * 0.5)
+            y = np.where(is_vertical, (ry1 + ry0) * 0.5, (1 - S) * ry1 + S * ry0)
+
+            delta_1 = self.HALLWAY_WIDTH * S
+            delta_2 = self.HALLWAY_WIDTH * (1 - S)
+            hx1 = np.round(np.where(is_vertical, x - delta_1, x))
+            hx2 = np.round(np.where(is_vertical, x + delta_2, x))
+            hy1 = np.round(np.where(is_vertical, y, y + delta_2))
+            hy2 = np.round(np.where(is_vertical, y, y - delta_1))
+            sx, sy = np.round(x), np.round(y)
+
+            def contains(px, py):
+                return (rx0 < px) & (px < rx1) & (ry0 < py) & (py < ry1)
+
+            use_hall = hallway & contains(hx1, hy1) & contains(hx2, hy2)
+            can_split = contains(sx, sy)
+
+            # The hallway fallback split is not guarded in subdivide_room
+            if np.any(live & hallway & ~use_hall & ~can_split):
+                raise InvalidSubdivisionException()
+
+            jilted[:, i] = live & ~hallway & ~can_split
+            split = live & ~jilted[:, i]
+
+            cut_a_x = np.where(use_hall, hx1, sx)
+            cut_a_y = np.where(use_hall, hy1, sy)
+            cut_b_x = np.where(use_hall, hx2, sx)
+            cut_b_y = np.where(use_hall, hy2, sy)
+
+            # A is left of a vertical cut and above a horizontal one
+            rects = [
+                (first, 0, (rx0, np.where(is_vertical, ry0, cut_a_y), np.where(is_vertical, cut_a_x, rx1), ry1)),
+                (second, 1, (np.where(is_vertical, cut_b_x, rx0), ry0, rx1, np.where(is_vertical, ry1, cut_b_y))),
+            ]
+            for slot, position, (sx0, sy0, sx1, sy1) in rects:
+                r, s = rows[split], slot[split]
+                x0[r, s], y0[r, s], x1[r, s], y1[r, s] = sx0[split], sy0[split], sx1[split], sy1[split]
+                exists[r, s] = True
+                append_key[r, s] = visit[split, i] * 3 + position
+
+            hall = split & use_hall
+            h = topology.hall_slot[i]
+            x0[hall, h] = np.where(is_vertical, hx1, rx0)[hall]
+            y0[hall, h] = np.where(is_vertical, ry0, hy2)[hall]
+            x1[hall, h] = np.where(is_vertical, hx2, rx1)[hall]
+            y1[hall, h] = np.where(is_vertical, ry1, hy1)[hall]
+            exists[hall, h] = True
+            append_key[hall, h] = visit[hall, i] * 3 + 2
+
+        return PopulationLayout(self, topology, x0, y0, x1, y1, exists, jilted, visit, append_key)
+
+    def slot_kinds(self, topology, layout):
+        # Kind of every slot once fully instantiated (Empty for split nodes)
+        num_nodes = topology.num_nodes
+        kinds = np.full(layout.exists.shape, GroomKinds.Empty, dtype=np.int64)
+        leaves = topology.leaves
+        kinds[:, leaves] = self.room_kinds[topology.room_index[leaves]]
+        kinds[:, :num_nodes][layout.jilted] = GroomKinds.Jilted
+        kinds[:, num_nodes:] = GroomKinds.Hallway
+        return kinds
+
+    def node_scores(self, topology, layout):
+        num_trees = layout.exists.shape[0]
+        num_nodes = topology.num_nodes
+        node_scores = np.full((num_trees, num_nodes), np.nan)
+        node_scores[layout.jilted] = 0.0
+
+        final_kinds = self.slot_kinds(topology, layout)
+        is_leaf = np.zeros(num_nodes, dtype=bool)
+        is_leaf[topology.leaves] = True
+        parent_visit = np.where(topology.parent >= 0, layout.visit[:, np.maximum(topology.parent, 0)], -1)
+        hall_owner = topology.internal
+
+        for leaf in topology.leaves:
+            now = layout.visit[:, leaf][:, np.newaxis]
+            reached = layout.exists[:, leaf]
+            if not reached.any():
+                continue
+
+            # Rooms of the partly subdivided plan when this leaf is scored
+            terminal = is_leaf | layout.jilted
+            present = np.zeros(layout.exists.shape, dtype=bool)
+            present[:, :num_nodes] = layout.exists[:, :num_nodes] & (parent_visit < now) & (terminal | (layout.visit > now))
+            present[:, leaf] = layout.exists[:, leaf]
+            present[:, num_nodes:] = layout.exists[:, num_nodes:] & (layout.visit[:, hall_owner] < now)
+
+            kinds = final_kinds.copy()
+            kinds[:, :num_nodes][layout.visit > now] = GroomKinds.Empty
+            kinds[:, :num_nodes][(layout.visit == now) & layout.jilted] = GroomKinds.Empty
+
+            kind = self.room_kinds[topology.room_index[leaf]]
+            scores = layout.tree_scores(leaf, kind, present, kinds)
+            node_scores[reached, leaf] = scores[reached]
+
+        return node_scores
+
+    def plan_scores(self, topology, layout):
+        weights = self.weights
+        kinds = self.slot_kinds(topology, layout)
+        present = layout.exists & (kinds != GroomKinds.Empty)
+
+        room_scores = np.full(present.shape, np.nan)
+        for slot in range(topology.num_slots):
+            slot_present = present[:, slot]
+            if not slot_present.any():
+                continue
+            slot_kinds = kinds[:, slot]
+            for kind in np.unique(slot_kinds[slot_present]):
+                rows = slot_present & (slot_kinds == kind)
+                scores = layout.tree_scores(slot, kind, present, kinds)
+                # Python's pow, np.power can differ in the last bit
+                weight = self.kind_grooms[kind].tree_weight(weights)
+                exponent = weights.scoreCurveExponent
+                room_score = np.array([ (1 - score * weight)**exponent for score in scores.tolist() ])
+                room_scores[rows, slot] = room_score[rows]
+
+        # Sum in FloorPlan.rooms order so results match score_floorplan,
+        included = ~np.isnan(room_scores)
+        room_order = np.argsort(np.where(included, layout.append_key, np.iinfo(np.int64).max), axis=1, kind="mergesort")
+        ordered = np.where(included, room_scores, 0.0)[np.arange(len(room_order))[:, None], room_order]
+
+        # and with the builtin sum, which is compensated for floats
+        counts = included.sum(axis=1).tolist()
+        return np.array([ 1 - sum(row[:count]) / count for row, count in zip(ordered.tolist(), counts) ])
+
+
+class PopulationLayout(object):
+
+    # Room rectangles of every tree in a population, one column per slot
+    # (tree node or hallway), plus the pairwise adjacency between slots.
+
+    def __init__(self, evaluator, topology, x0, y0, x1, y1, exists, jilted, visit, append_key):
+        self.weights = evaluator.weights
+        self.kind_grooms = evaluator.kind_grooms
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self.exists = exists
+        self.jilted = jilted
+        self.visit = visit
+        self.append_key = append_key
+
+        with np.errstate(invalid='ignore'):
+            touch_vertical = (x1[:, :, None] == x0[:, None, :]) | (x0[:, :, None] == x1[:, None, :])
+            touch_horizontal = (y1[:, :, None] == y0[:, None, :]) | (y0[:, :, None] == y1[:, None, :])
+            overlap_y = np.minimum(y1[:, :, None], y1[:, None, :]) - np.maximum(y0[:, :, None], y0[:, None, :])
+            overlap_x = np.minimum(x1[:, :, None], x1[:, None, :]) - np.maximum(x0[:, :, None], x0[:, None, :])
+
+            self.edge_vertical = touch_vertical & (overlap_y > 0)
+            edge_horizontal = touch_horizontal & (overlap_x > 0)
+
+        self.adjacent = self.edge_vertical | edge_horizontal
+        self.edge_length = np.where(self.edge_vertical, overlap_y, np.where(edge_horizontal, overlap_x, 0.0))
+
+        width = x1 - x0
+        height = y1 - y0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.min_aspect_ratio = np.minimum(width / height, height / width)
+        outside_vertical = (x0 == 0).astype(np.int64) + (x1 == evaluator.lot_width)
+        outside_horizontal = (y0 == 0).astype(np.int64) + (y1 == evaluator.lot_height)
+        self.one_outside_vertical = outside_vertical == 1
+        self.one_outside_horizontal = outside_horizontal == 1
+
+    def tree_scores(self, slot, kind, present, kinds):
+        # groom.tree_score of the room in `slot` for every tree, given which
+        # slots are rooms and their kinds; NaN stands for a None score. The
+        # features are read off the layout, the rules are the groom's own.
+        neighbors = self.adjacent[:, slot, :] & present
+        neighbors[:, slot] = False
+        mar = self.min_aspect_ratio[:, slot]
+        features = { 'min_aspect_ratio': mar }
+
+        if kind == GroomKinds.Dining:
+            kitchens = present & (kinds == GroomKinds.Kitchen)
+            hallways = neighbors & (kinds == GroomKinds.Hallway)
+            hallway_near_kitchen = (self.adjacent & kitchens[:, None, :]).any(axis=2)
+            features['near_kitchen'] = (neighbors & kitchens).any(axis=1)
+            features['near_hallway_kitchen'] = (hallways & hallway_near_kitchen).any(axis=1)
+
+        if kind == GroomKinds.Hallway:
+            lengths = self.edge_length[:, slot, :]
+            counted = neighbors & (lengths >= HallwayGroom.min_neighbor_edge) & (kinds != GroomKinds.Hallway)
+            features['non_hall_neighbors'] = counted.sum(axis=1)
+
+        if kind == GroomKinds.Bed:
+            non_bedgrooms = neighbors & np.isin(kinds, groom_kinds(BedGroom.non_bedroom_grooms))
+            features['no_non_bedgrooms'] = ~non_bedgrooms.any(axis=1)
+
+            one_vertical = self.one_outside_vertical[:, slot]
+            one_horizontal = self.one_outside_horizontal[:, slot]
+            blockers = neighbors & np.isin(kinds, groom_kinds(BedGroom.blocking_grooms))
+            vertical_edges = self.edge_vertical[:, slot, :]
+            blocks_vertical = one_vertical & (blockers & vertical_edges & self.one_outside_vertical).any(axis=1)
+            blocks_horizontal = one_horizontal & (blockers & ~vertical_edges & self.one_outside_horizontal).any(axis=1)
+            features['is_blocking'] = ~(one_vertical & one_horizontal) & (blocks_vertical | blocks_horizontal)
+
+        return np.zeros(mar.shape) + self.kind_grooms[kind].score_tree_features(features, self.weights)
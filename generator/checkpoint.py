@@ -0,0 +1,49 @@
+import gzip
+import os
+import pickle
+
+
+# Checkpoints of a GA (GeneticTreeShaker, GenomeTreeShaker, GeneticDoorShaker
+# or GeneticWeightFrobber): its get_state() plus the state of its rng, pickled
+# and gzipped. Resuming restores both, so a resumed run continues exactly
+# like the uninterrupted one would have.
+
+def save_checkpoint(filename, shaker):
+    checkpoint = {
+        'shaker': type(shaker).__name__,
+        'state': shaker.get_state(),
+        'random': shaker.rng.getstate(),
+    }
+    # Write aside and rename so a crash mid-write keeps the last checkpoint
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    with gzip.open(filename + ".tmp", 'wb') as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(filename + ".tmp", filename)
+
+
+def load_checkpoint(filename, shaker):
+    with gzip.open(filename, 'rb') as f:
+        checkpoint = pickle.load(f)
+
+    if checkpoint['shaker'] != type(shaker).__name__:
+        raise ValueError("Checkpoint is for a {}, not a {}".format(checkpoint['shaker'], type(shaker).__name__))
+
+    shaker.set_state(checkpoint['state'])
+    shaker.rng.setstate(checkpoint['random'])
+
+
+class Checkpointer(object):
+
+    def __init__(self, filename, every=10):
+        self.filename = filename
+        self.every = every
+
+    def resume(self, shaker):
+        if not os.path.exists(self.filename):
+            return False
+        load_checkpoint(self.filename, shaker)
+        return True
+
+    def after_generation(self, shaker):
+        if shaker.generation % self.every == 0:
+            save_checkpoint(self.filename, shaker)
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+import numpy as np
+
+from generator.fitness_cache import FitnessCache
+
+
+# Door vectors packed into Python ints, bit i for edge i. A packed vector is
+# a compact, hashable key for the doors a vector puts on a plan, and
+# crossover and mutation are a few bitwise ops.
+
+def pack_vector(vector):
+    return pack_rows([ vector ])[0]
+
+
+def unpack_vector(bits, length):
+    return [ (bits >> i) & 1 for i in range(length) ]
+
+
+def pack_rows(doors):
+    # packbits fills bytes high bit first, so rows are packed reversed and
+    # read big-endian, then shifted past the padding of the last byte
+    doors = np.asarray(doors, dtype=bool).reshape(len(doors), -1)
+    padding = -doors.shape[1] % 8
+    packed = np.packbits(doors[:, ::-1], axis=1)
+    return [ int.from_bytes(row.tobytes(), 'big') >> padding for row in packed ]
+
+
+def unpack_rows(rows, length):
+    # Boolean matrix of packed rows, length columns each
+    num_bytes = (length + 7) // 8
+    data = b''.join(bits.to_bytes(num_bytes, 'little') for bits in rows)
+    unpacked = np.unpackbits(np.frombuffer(data, dtype=np.uint8).reshape(len(rows), num_bytes, 1), axis=2)
+    return unpacked[:, :, ::-1].reshape(len(rows), num_bytes * 8)[:, :length].astype(bool)
+
+
+def crossover_bits(a, b, from_b):
+    # Bits set in from_b come from b, the rest from a
+    return (a & ~from_b) | (b & from_b)
+
+
+def mutate_bits(bits, flips):
+    return bits ^ flips
+
+
+class DoorScoreCache(FitnessCache):
+
+    # Bounded LRU cache of (connectivity, door) scores keyed by the packed
+    # doors a vector puts on one plan. Vectors that differ only on edges too
+    # short for a door share an entry. Entries are only valid for one plan.
+
+    def score_doors(self, keys, doors, score_parts):
+        # score_parts scores a door matrix into (connectivity, door) arrays.
+        # Only the first row of each distinct key reaches it.
+        scores = {}
+        pending = OrderedDict()
+        for row, key in enumerate(keys):
+            if key in scores or key in pending:
+                self.hits += 1
+                continue
+            entry = self.get(key)
+            if entry is None:
+                pending[key] = row
+            else:
+                scores[key] = entry
+
+        if pending:
+            rows = list(pending.values())
+            connectivity, door = score_parts(doors[rows])
+            for key, c, d in zip(pending.keys(), connectivity.tolist(), door.tolist()):
+                scores[key] = (c, d)
+                self.put(key, (c, d))
+
+        # Served from scores, as putting new entries can evict earlier hits
+        return [ scores[key] for key in keys ]
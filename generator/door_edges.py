@@ -0,0 +1,44 @@
+import numpy as np
+
+from generator.groom import HallwayGroom
+
+
+class DoorEdgeIndex(object):
+
+    # The edges of one plan a door search can actually decide. add_doors
+    # ignores edges too short for a door, and the renderer leaves the wall
+    # between two hallways out, so that edge is an open passage whatever
+    # the vector says. A door genome has one entry per remaining edge;
+    # expand() turns it back into a vector as long as fp.edges, with the
+    # hallway passages open.
+
+    def __init__(self, fp, radius=3.99, open_hallways=True):
+        edge_table = fp.edge_table
+        self.num_edges = len(edge_table)
+        eligible = edge_table.door_eligible(radius)
+
+        hallways = np.array([ type(room.groom) is HallwayGroom for room in fp.rooms ] + [False])
+        passage = hallways[edge_table.positive] & hallways[edge_table.negative]
+        fixed = eligible & passage if open_hallways else np.zeros(self.num_edges, dtype=bool)
+
+        self.edge_ids = np.flatnonzero(eligible & ~fixed)
+        self.open_ids = np.flatnonzero(fixed)
+        self.p0 = edge_table.p0[self.edge_ids]
+        self.p1 = edge_table.p1[self.edge_ids]
+        self.positive = edge_table.positive[self.edge_ids]
+        self.negative = edge_table.negative[self.edge_ids]
+
+    def __len__(self):
+        return len(self.edge_ids)
+
+    def expand_rows(self, genomes):
+        vectors = np.zeros((len(genomes), self.num_edges), dtype=np.int8)
+        vectors[:, self.edge_ids] = np.asarray(genomes, dtype=np.int8).reshape(len(genomes), len(self.edge_ids))
+        vectors[:, self.open_ids] = 1
+        return vectors
+
+    def expand(self, genome):
+        return self.expand_rows([genome])[0].tolist()
+
+    def compact(self, vector):
+        return np.asarray(vector, dtype=np.int8)[self.edge_ids].tolist()
@@ -0,0 +1,132 @@
+import math
+import numpy as np
+from collections import OrderedDict
+
+
+class FitnessCache(object):
+
+    # Bounded LRU cache of tree scores keyed by the genome. An entry holds the
+    # score of every preorder node after scoring (the root's is the plan
+    # score), NaN for the nodes scoring leaves untouched, so a hit sets
+    # exactly what re-scoring would. Entries are only valid for one set of
+    # rooms, weights and lot size.
+
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @staticmethod
+    def list_nodes(node):
+        nodes = [node]
+        for child in node.children:
+            nodes.extend(FitnessCache.list_nodes(child))
+        return nodes
+
+    @staticmethod
+    def tree_key(node):
+        return tuple(
+            (n.orientation, n.order, bool(n.padding), n.t, tuple(n.room_indexes), len(n.children))
+            for n in FitnessCache.list_nodes(node)
+        )
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    @staticmethod
+    def apply(nodes, entry):
+        for node, score in zip(nodes, entry):
+            if not (isinstance(score, float) and math.isnan(score)):
+                node.score = score
+
+    def score_candidates(self, candidates, score_function):
+        # score_function scores a list of candidates in place. Only the first
+        # of each distinct genome reaches it; the rest are served from cache.
+        pending = OrderedDict()
+        for candidate in candidates:
+            key = FitnessCache.tree_key(candidate)
+            nodes = FitnessCache.list_nodes(candidate)
+            if key in pending:
+                self.hits += 1
+                pending[key][1].append(nodes)
+                continue
+            entry = self.get(key)
+            if entry is not None:
+                FitnessCache.apply(nodes, entry)
+            else:
+                pending[key] = (candidate, [nodes])
+
+        if not pending:
+            return
+
+        # Mark every node so the ones scoring does not touch can be told apart
+        stale = []
+        for candidate, node_lists in pending.values():
+            stale.append([ node.score for node in node_lists[0] ])
+            for node in node_lists[0]:
+                node.score = float('nan')
+
+        score_function([ candidate for candidate, node_lists in pending.values() ])
+
+        for key, (candidate, node_lists), old_scores in zip(pending.keys(), pending.values(), stale):
+            entry = tuple(node.score for node in node_lists[0])
+            self.put(key, entry)
+            for node, score in zip(node_lists[0], old_scores):
+                if isinstance(node.score, float) and math.isnan(node.score):
+                    node.score = score
+            for nodes in node_lists[1:]:
+                FitnessCache.apply(nodes, entry)
+
+    def score_genomes(self, genomes, score_function):
+        # As score_candidates, for TreeGenome candidates; entries are node
+        # score arrays with NaN for nodes scoring leaves alone.
+        pending = OrderedDict()
+        for genome in genomes:
+            key = genome.key
+            if key in pending:
+                self.hits += 1
+                pending[key].append(genome)
+                continue
+            entry = self.get(key)
+            if entry is not None:
+                genome.apply_scores(entry)
+            else:
+                pending[key] = [genome]
+
+        if not pending:
+            return
+
+        firsts = [ group[0] for group in pending.values() ]
+        stale = [ genome.node_scores for genome in firsts ]
+        for genome in firsts:
+            genome.node_scores = np.full(len(genome.node_scores), np.nan)
+
+        score_function(firsts)
+
+        for key, group, old_scores in zip(pending.keys(), pending.values(), stale):
+            entry = group[0].node_scores
+            self.put(key, entry.copy())
+            group[0].node_scores = np.where(np.isnan(entry), old_scores, entry)
+            for genome in group[1:]:
+                genome.apply_scores(entry)
@@ -0,0 +1,62 @@
+import numpy as np
+
+from generator.groom import *
+
+
+class PlanFeatures(object):
+
+    # The fixed floorplans of a weight-frobbing run reduced to the features
+    # their grooms' tree_features read off each room. score() then hands the
+    # features of every groom type, with a column of weights per weight set,
+    # to that groom's score_tree_features, so a batch of weight sets is
+    # rated without walking rooms again and by the same rules as
+    # FloorplanEvaluator.score_floorplan.
+
+    def __init__(self, floorplans):
+        plan = []
+        groups = {}
+        for p, fp in enumerate(floorplans):
+            for room in fp.rooms:
+                groom, rows, features = groups.setdefault(type(room.groom), (room.groom, [], []))
+                rows.append(len(plan))
+                features.append(room.groom.tree_features(room))
+                plan.append(p)
+
+        self.num_plans = len(floorplans)
+        self.num_rooms = len(plan)
+        self.plan = np.array(plan, dtype=np.intp)
+        self.groups = [
+            (groom, np.array(rows, dtype=np.intp), { name: np.array([ f[name] for f in features ]) for name in features[0] })
+            for groom, rows, features in groups.values()
+        ]
+        self.membership = np.zeros((self.num_rooms, self.num_plans))
+        self.membership[np.arange(self.num_rooms), self.plan] = 1.0
+
+    def weight_columns(self, weight_dicts):
+        # TreeWeights whose fields are columns, one entry per weight set
+        return TreeWeights(**{
+            name: np.array([ float(weights[name]) for weights in weight_dicts ])[:, None]
+            for name in default_tree_weights
+        })
+
+    def tree_scores(self, w):
+        # tree_score of every room (columns) for every weight set (rows),
+        # NaN where it is None, and the tree_weight of each room's groom
+        shape = (len(w.scoreCurveExponent), self.num_rooms)
+        scores = np.zeros(shape)
+        tree_weights = np.zeros(shape)
+        for groom, rows, features in self.groups:
+            scores[:, rows] = np.broadcast_to(groom.score_tree_features(features, w), (shape[0], len(rows)))
+            tree_weights[:, rows] = np.broadcast_to(groom.tree_weight(w), (shape[0], 1))
+        return scores, tree_weights
+
+    def score(self, weight_dicts):
+        # score_floorplan of every plan (columns) for every weight set (rows)
+        w = self.weight_columns(weight_dicts)
+        scores, tree_weights = self.tree_scores(w)
+
+        # Rooms scored None are left out of the plan mean
+        included = ~np.isnan(scores)
+        room_scores = (1 - scores * tree_weights) ** w.scoreCurveExponent
+        room_scores[~included] = 0.0
+        return 1 - room_scores @ self.membership / (included @ self.membership)
@@ -1,20 +1,41 @@
-from bakedrandom import brandom as random
+from bakedrandom import brandom as random, RandomStream, coin_flips, random_array
+from random import Random
+from generator.selection import uniform_indexes
 from evaluator.door_judge import DoorJudge
+from evaluator.batch_door_judge import BatchDoorJudge
+from generator.door_bits import pack_vector, pack_rows, unpack_vector, unpack_rows, crossover_bits, mutate_bits
 from recordclass import recordclass
 
+# A member of the population: its door genome packed into an int, bit i
+# for entry i, and its score
 DoorVectorScore = recordclass("DoorVectorScore", [
-    "vector",
+    "bits",
     "score"
 ])
 
 class GeneticDoorShaker(object):
 
-    def __init__(self, fp, initial_population, population_size=30, num_crossovers=30, prob_point_mutation=0.1):
+    def __init__(self, fp, initial_population, population_size=30, num_crossovers=30, prob_point_mutation=0.1, rng=None, batch_judge=None, door_cache=None, door_index=None):
         self.fp = fp
-        self.population = [ DoorVectorScore(vector, 0) for vector in initial_population ]
+        self.length = len(initial_population[0]) if initial_population else 0
+        self.population = [ DoorVectorScore(pack_vector(vector), 0) for vector in initial_population ]
         self.population_size = population_size
         self.prob_point_mutation = prob_point_mutation
         self.num_crossovers = num_crossovers
+        self.generation = 0
+        self.rng = rng or random
+        # Scores do not depend on which side of its edge a door is put, so
+        # add_doors draws sides from their own stream. self.rng then makes
+        # the same draws whichever way candidates are scored.
+        self.side_rng = Random(0)
+        # Scores whole generations as a door matrix instead of on self.fp
+        self.batch_judge = batch_judge
+        # Skips re-scoring door layouts already seen on this plan
+        self.door_cache = door_cache
+        if door_cache is not None and batch_judge is None:
+            self.batch_judge = BatchDoorJudge(fp)
+        # With a DoorEdgeIndex, vectors are genomes over its edges only
+        self.door_index = door_index
 
     def run_generation(self):
         candidates = self.crossover_population()
@@ -22,6 +43,27 @@ class GeneticDoorShaker(object):
         self.score_candidates(candidates)
         self.population.extend(candidates)
         self.filter_population()
+        self.generation += 1
+
+    def get_state(self):
+        return { 'population': self.population, 'generation': self.generation }
+
+    def set_state(self, state):
+        self.population = state['population']
+        self.generation = state['generation']
+
+    def full_vectors(self, vectors):
+        if self.door_index is None:
+            return vectors
+        return self.door_index.expand_rows(vectors)
+
+    def vector(self, candidate):
+        return unpack_vector(candidate.bits, self.length)
+
+    @property
+    def best_vector(self):
+        # Door vector of the best candidate, as long as fp.edges
+        return [ int(is_door) for is_door in self.full_vectors([ self.vector(self.population[0]) ])[0] ]
 
     def filter_population(self):
         self.population.sort(key=lambda node: node.score, reverse=True)
@@ -29,32 +71,44 @@ class GeneticDoorShaker(object):
         self.population = self.population[:self.population_size]
 
     def score_candidates(self, candidates):
-        for candidate in candidates:
+        if self.batch_judge is not None:
+            doors = self.batch_judge.doors(self.full_vectors(unpack_rows([ candidate.bits for candidate in candidates ], self.length)))
+            if self.door_cache is not None:
+                parts = self.door_cache.score_doors(pack_rows(doors), doors, self.batch_judge.score_parts)
+            else:
+                parts = zip(*[ scores.tolist() for scores in self.batch_judge.score_parts(doors) ])
+            for candidate, (connectivity, door) in zip(candidates, parts):
+                candidate.score = connectivity + door
+            return
+
+        for candidate, vector in zip(candidates, self.full_vectors([ self.vector(candidate) for candidate in candidates ])):
             dj = DoorJudge()
             self.fp.clear_doors()
-            self.fp.add_doors(candidate.vector)
+            self.fp.add_doors(vector, self.side_rng)
 
             cscore = dj.score_connectivity(self.fp)
             dscore = dj.score_individual_doors(self.fp)
             candidate.score = cscore + dscore
 
     def crossover_population(self):
+        if isinstance(self.rng, RandomStream):
+            # Streams draw every parent of the generation at once
+            parents = uniform_indexes(len(self.population), (self.num_crossovers, 2), self.rng)
+            return [ self.crossover_individuals(self.population[a], self.population[b]) for a, b in parents ]
+
         candidates = []
         for i in range(self.num_crossovers):
-            a = random.choice(self.population)
-            b = random.choice(self.population)
+            a = self.rng.choice(self.population)
+            b = self.rng.choice(self.population)
             c = self.crossover_individuals(a, b)
             candidates.append(c)
         return candidates
 
     def crossover_individuals(self, a, b):
-        new_vector = []
-
-        for i, j in zip(a.vector, b.vector):
-            new_vector.append(random.choice([i, j]))
+        from_b = coin_flips(self.rng, self.length)
 
         return DoorVectorScore(
-            vector=new_vector,
+            bits=crossover_bits(a.bits, b.bits, pack_vector(from_b)),
             score=0
         )
 
@@ -63,6 +117,5 @@ class GeneticDoorShaker(object):
             self.mutate_individual(candidate)
 
     def mutate_individual(self, candidate):
-        for i in range(len(candidate.vector)):
-            if random.random() < self.prob_point_mutation:
-                candidate.vector[i] = 1 - candidate.vector[i]
+        flips = random_array(self.rng, self.length) < self.prob_point_mutation
+        candidate.bits = mutate_bits(candidate.bits, pack_vector(flips))
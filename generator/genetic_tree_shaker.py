@@ -1,6 +1,9 @@
-from bakedrandom import brandom as random
+from bakedrandom import brandom as random, RandomStream, random_array
 from generator.node import Node
 from generator.subdivide_tree_generator import *
+from generator.batch_evaluator import TreeTopology
+from generator.genome import TreeGenome
+from generator.selection import AliasSampler, PrefixSampler, PrefixRowSampler, uniform_indexes, weighted_rows
 import copy
 from multiprocessing import Pool
 from core.edge import Orientation, Edge
@@ -19,7 +22,10 @@ class GeneticTreeShaker(object):
             prob_order_mutates=0.35,
             prob_t_mutates=0.2,
             prob_padding_mutates=0.1,
-            t_mutation_magnitude=0.1
+            t_mutation_magnitude=0.1,
+            batch_evaluator=None,
+            fitness_cache=None,
+            rng=None
         ):
 
         adam.score = 0
@@ -35,6 +41,15 @@ class GeneticTreeShaker(object):
         self.prob_t_mutates = prob_t_mutates
         self.t_mutation_magnitude = t_mutation_magnitude
 
+        self.generation = 0
+        self.rng = rng or random
+
+        # Scores whole generations as arrays instead of one plan at a time
+        self.batch_evaluator = batch_evaluator
+        if batch_evaluator is not None:
+            self.topology = TreeTopology(adam, list_o_rooms)
+        self.fitness_cache = fitness_cache
+
 
     def list_nodes(self, candidate):
         nodes = [candidate]
@@ -48,6 +63,14 @@ class GeneticTreeShaker(object):
         self.score_candidates(candidates)
         self.population.extend(candidates)
         self.filter_population()
+        self.generation += 1
+
+    def get_state(self):
+        return { 'population': self.population, 'generation': self.generation }
+
+    def set_state(self, state):
+        self.population = state['population']
+        self.generation = state['generation']
 
     def filter_population(self):
         self.population.sort(key=lambda node: node.score, reverse=True)
@@ -61,6 +84,16 @@ class GeneticTreeShaker(object):
         #     for candidate, score in zip(candidates, scores):
         #         candidate.score = score
 
+        if self.fitness_cache is not None:
+            self.fitness_cache.score_candidates(candidates, self.score_uncached_candidates)
+        else:
+            self.score_uncached_candidates(candidates)
+
+    def score_uncached_candidates(self, candidates):
+        if self.batch_evaluator is not None:
+            self.batch_evaluator.score_candidates(candidates, self.topology)
+            return
+
         for candidate in candidates:
             fp = self.fp_instantiator.generate_candidate_floorplan(candidate)
             candidate.score = self.fp_evaluator.score_floorplan(fp)
@@ -69,25 +102,43 @@ class GeneticTreeShaker(object):
         fp = self.fp_instantiator.generate_candidate_floorplan(candidate)
         return self.fp_evaluator.score_floorplan(fp)
 
+    def selection_weights(self, candidate):
+        return [ 1 - node.score if node.score else 1 for node in self.list_nodes(candidate) ]
+
     def crossover_population(self):
+        # Crossover sites of a parent come from one sampler, built the first
+        # time it is drawn in the generation. Streams use alias samplers;
+        # brandom keeps PrefixSampler's single draw so seeded runs are
+        # unchanged.
+        Sampler = AliasSampler if isinstance(self.rng, RandomStream) else PrefixSampler
+        samplers = {}
+        def sampler(index):
+            if index not in samplers:
+                samplers[index] = Sampler(self.selection_weights(self.population[index]))
+            return samplers[index]
+
+        if isinstance(self.rng, RandomStream):
+            # Streams draw every parent of the generation at once
+            parents = uniform_indexes(len(self.population), (self.num_crossovers, 2), self.rng)
+            return [ self.crossover_individuals(self.population[a], self.population[b], sampler(a)) for a, b in parents ]
+
         candidates = []
         for i in range(self.num_crossovers):
-            a = random.choice(self.population)
-            b = random.choice(self.population)
-            c = self.crossover_individuals(a, b)
+            a = self.rng.choice(range(len(self.population)))
+            b = self.rng.choice(range(len(self.population)))
+            c = self.crossover_individuals(self.population[a], self.population[b], sampler(a))
             candidates.append(c)
         return candidates
 
-    def crossover_individuals(self, a, b):
+    def crossover_individuals(self, a, b, sampler=None):
+        sampler = sampler or PrefixSampler(self.selection_weights(a))
         a, b = copy.deepcopy(a), copy.deepcopy(b)
         nodesA = self.list_nodes(a)
         nodesB = self.list_nodes(b)
 
         assert len(nodesA) == len(nodesB)
 
-        random_indexes = range(0, len(nodesA))
-        weights = [ 1 - node.score if node.score else 1 for node in nodesA ]
-        random_index = weighted_choice(list(zip(random_indexes, weights)))
+        random_index = sampler.sample(self.rng)
 
         subtreeA = nodesA[random_index]
         subtreeB = nodesB[random_index]
@@ -104,18 +155,17 @@ class GeneticTreeShaker(object):
         # return child
 
     def mutate_candidates(self, candidates):
-        for candidate in candidates:
+        sampler = PrefixRowSampler([ self.selection_weights(candidate) for candidate in candidates ])
+        for row, candidate in enumerate(candidates):
             nodes = self.list_nodes(candidate)
-
-            weights = [ 1 - node.score if node.score else 1 for node in nodes ]
-            rand_node = weighted_choice(list(zip(nodes, weights)))
+            rand_node = nodes[sampler.sample(row, self.rng)]
 
             self.mutate_individual(rand_node)
 
     def mutate_individual(self, candidate):
-        if random.random() < self.prob_order_mutates:
+        if self.rng.random() < self.prob_order_mutates:
             candidate.order *= -1
-        if random.random() < self.prob_orientation_mutates:
+        if self.rng.random() < self.prob_orientation_mutates:
             candidate.orientation = candidate.orientation.negate()
             # if candidate.orientation == Orientation.Vertical:
             #     candidate.orientation = Orientation.Horizontal
@@ -124,7 +174,7 @@ class GeneticTreeShaker(object):
 
         # if random.random() < self.prob_t_mutates:
         #     candidate.t += random.uniform(-self.t_mutation_magnitude, self.t_mutation_magnitude)
-        if random.random() < self.prob_padding_mutates:
+        if self.rng.random() < self.prob_padding_mutates:
             candidate.padding = not candidate.padding
 
         candidate.t = min(max(candidate.t, 0.3), 0.7)
@@ -134,13 +184,77 @@ class GeneticTreeShaker(object):
 
 
 
-# https://stackoverflow.com/questions/3679694
-def weighted_choice(choices):
-    total = sum(w for c, w in choices)
-    r = random.uniform(0, total)
-    upto = 0
-    for c, w in choices:
-        if upto + w >= r:
-            return c
-        upto += w
-    assert False, "Shouldn't get here"
+class GenomeTreeShaker(GeneticTreeShaker):
+
+    # GeneticTreeShaker over TreeGenome arrays instead of Node trees: no
+    # deepcopy, and crossover and mutation are slice operations. It draws
+    # random numbers in the same order, so a seeded run evolves the same
+    # population. Members of the population are TreeGenomes; use to_node()
+    # for a Node tree.
+
+    def __init__(self, adam, list_o_rooms, fp_instantiator, fp_evaluator, **kwargs):
+        super(GenomeTreeShaker, self).__init__(adam, list_o_rooms, fp_instantiator, fp_evaluator, **kwargs)
+        self.topology = TreeTopology(adam, list_o_rooms)
+        self.population = [ TreeGenome.from_node(adam, self.topology) ]
+
+    def set_state(self, state):
+        super(GenomeTreeShaker, self).set_state(state)
+        for genome in self.population:
+            genome.topology = self.topology
+
+    def selection_weights(self, candidate):
+        return candidate.selection_weights
+
+    def crossover_individuals(self, a, b, sampler=None):
+        sampler = sampler or PrefixSampler(a.selection_weights)
+        c = a.copy()
+        c.crossover(b, sampler.sample(self.rng))
+        return c
+
+    def mutate_candidates(self, candidates):
+        if isinstance(self.rng, RandomStream):
+            # Streams draw the mutation site of every candidate at once
+            sites = weighted_rows([ candidate.selection_weights for candidate in candidates ], self.rng)
+            for candidate, site in zip(candidates, sites):
+                self.mutate_genome(candidate, site)
+            return
+
+        sampler = PrefixRowSampler([ candidate.selection_weights for candidate in candidates ])
+        for row, candidate in enumerate(candidates):
+            self.mutate_genome(candidate, sampler.sample(row, self.rng))
+
+    def mutate_genome(self, candidate, index):
+        # Three draws per node in preorder, as mutate_individual makes them
+        size = self.topology.size[index]
+        draws = random_array(self.rng, 3 * size).reshape(size, 3)
+        candidate.mutate(
+            index,
+            draws[:, 0] < self.prob_order_mutates,
+            draws[:, 1] < self.prob_orientation_mutates,
+            draws[:, 2] < self.prob_padding_mutates,
+        )
+
+    def score_candidates(self, candidates):
+        if self.fitness_cache is not None:
+            self.fitness_cache.score_genomes(candidates, self.score_uncached_candidates)
+        else:
+            self.score_uncached_candidates(candidates)
+
+    def score_uncached_candidates(self, candidates):
+        if self.batch_evaluator is not None:
+            scores, node_scores = self.batch_evaluator.score_arrays(self.topology, *TreeGenome.stack(candidates))
+            for candidate, score, row in zip(candidates, scores, node_scores):
+                candidate.apply_scores(row)
+                candidate.score = score
+            return
+
+        for candidate in candidates:
+            rootnode = candidate.to_node()
+            fp = self.fp_instantiator.generate_candidate_floorplan(rootnode)
+            rootnode.score = self.fp_evaluator.score_floorplan(fp)
+            candidate.node_scores = TreeGenome.from_node(rootnode, self.topology).node_scores
+
+
+def weighted_choice(choices, rng=None):
+    choices = list(choices)
+    return choices[PrefixSampler([ w for c, w in choices ]).sample(rng)][0]
@@ -1,8 +1,10 @@
 from bakedrandom import brandom as random
 from generator.tree_judge import FloorplanEvaluator
 from generator.groom import TreeWeights
+from generator.frob_features import PlanFeatures
 import numpy as np
 
+import math
 from multiprocessing import Pool
 
 
@@ -12,31 +14,88 @@ def softmax(x):
     return e_x / e_x.sum()
 
 
+def evaluate_pairs(evaluator, fp_pairs):
+    correct_count = 0
+    accuracy = 0
+    for good, bad in fp_pairs:
+        good_score = evaluator.score_floorplan(good)
+        bad_score = evaluator.score_floorplan(bad)
+        if good_score >= bad_score:
+            correct_count += 1
+        accuracy += bad_score - good_score
+
+    return -correct_count, accuracy,
+
+
+# Workers get the labelled pairs once, from the pool initializer; after that
+# only weight dicts go out and score tuples come back.
+_worker_pairs = None
+
+
+def _init_worker(fp_pairs):
+    global _worker_pairs
+    _worker_pairs = fp_pairs
+
+
+def _evaluate_weights(weights):
+    return evaluate_pairs(FloorplanEvaluator(TreeWeights(**weights)), _worker_pairs)
+
+
 class GeneticWeightFrobber(object):
 
     def __init__(self,
         initial_weights,
         fp_pairs,
+        rng=None,
+        use_features=True,
+        processes=11,
     ):
         self.fp_pairs = fp_pairs
+        # Without features, evaluate_candidate runs in a pool that lives for
+        # the whole run; close() ends it
+        self.processes = processes
+        self.pool = None
+        # The plans never change, so they are reduced to room features once
+        # and every generation is scored as one array computation
+        self.features = None
+        if use_features and fp_pairs:
+            plans = []
+            index = {}
+            for fp in [ fp for pair in fp_pairs for fp in pair ]:
+                if id(fp) not in index:
+                    index[id(fp)] = len(plans)
+                    plans.append(fp)
+            self.features = PlanFeatures(plans)
+            self.good_plans = np.array([ index[id(good)] for good, bad in fp_pairs ])
+            self.bad_plans = np.array([ index[id(bad)] for good, bad in fp_pairs ])
         self.population = [(initial_weights, (0, float('inf')))]
         self.prob_point_mutation = 0.5
         self.prob_inherit_from_b = 0.25
         self.num_candidates = 100
         self.population_size = 40
+        self.generation = 0
+        self.rng = rng or random
 
     def run_generation(self):
         candidates = self.crossover_population()
         candidates = self.mutate_candidates(candidates)
         scored_candidates = self.score_candidates(candidates)
         self.cull_herd(scored_candidates)
+        self.generation += 1
+
+    def get_state(self):
+        return { 'population': self.population, 'generation': self.generation }
+
+    def set_state(self, state):
+        self.population = state['population']
+        self.generation = state['generation']
 
     def crossover_population(self):
         candidates = []
         population = [ w for w, score in self.population ]
         for i in range(self.num_candidates):
-            a = random.choice(population)
-            b = random.choice(population)
+            a = self.rng.choice(population)
+            b = self.rng.choice(population)
             c = self.crossover_weights(a, b)
             candidates.append(c)
         return candidates
@@ -44,7 +103,7 @@ class GeneticWeightFrobber(object):
     def crossover_weights(self, a, b):
         child = dict(a)
         for key in a.keys():
-            if random.random() < self.prob_inherit_from_b:
+            if self.rng.random() < self.prob_inherit_from_b:
                 child[key] = b[key]
         return child
 
@@ -54,8 +113,8 @@ class GeneticWeightFrobber(object):
     def mutate_individual(self, weights):
         mutant = dict(weights)
         for key in weights.keys():
-            if random.random() <= self.prob_point_mutation:
-                mutant[key] += random.uniform(-0.3, 0.3)
+            if self.rng.random() <= self.prob_point_mutation:
+                mutant[key] += self.rng.uniform(-0.3, 0.3)
                 mutant[key] = max(0.05, mutant[key])
         self.normalize_groom_weights(mutant)
         mutant["scoreCurveExponent"] = max(1, mutant["scoreCurveExponent"])
@@ -74,24 +133,32 @@ class GeneticWeightFrobber(object):
             mutant[key] = float(normalized_weight)
 
     def score_candidates(self, candidates):
-        evaluator_candidates = [ FloorplanEvaluator(TreeWeights(**w)) for w in candidates ]
-        with Pool(11) as p:
-            scores = p.map(self.evaluate_candidate, evaluator_candidates)
-            return zip(candidates, scores)
+        if self.features is not None:
+            return zip(candidates, self.evaluate_weights(candidates))
+
+        if self.pool is None:
+            self.pool = Pool(self.processes, initializer=_init_worker, initargs=(self.fp_pairs,))
+        chunksize = max(1, math.ceil(len(candidates) / self.processes))
+        scores = self.pool.map(_evaluate_weights, candidates, chunksize=chunksize)
+        return zip(candidates, scores)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
 
     def evaluate_candidate(self, evaluator):
-        correct_count = 0
-        accuracy = 0
-        for good, bad in self.fp_pairs:
-            good_score = evaluator.score_floorplan(good)
-            bad_score = evaluator.score_floorplan(bad)
-            # print("Good socre: ", good_score, " bad score"z, bad_score)
-            if good_score >= bad_score:
-                correct_count += 1
-            # if bad_score >= good_score:
-            accuracy += bad_score - good_score
-
-        return -correct_count, accuracy,
+        return evaluate_pairs(evaluator, self.fp_pairs)
+
+    def evaluate_weights(self, candidates):
+        # evaluate_candidate for every weight dict, from the plan features
+        scores = self.features.score(candidates)
+        good = scores[:, self.good_plans]
+        bad = scores[:, self.bad_plans]
+        correct_count = (good >= bad).sum(axis=1)
+        accuracy = (bad - good).sum(axis=1)
+        return [ (-int(c), float(a)) for c, a in zip(correct_count, accuracy) ]
 
     def cull_herd(self, candidates):
         self.population.extend(candidates)
@@ -0,0 +1,107 @@
+import numpy as np
+
+from core.edge import Orientation
+from generator.node import Node
+
+
+class TreeGenome(object):
+
+    # A subdivide tree as preorder arrays over a shared TreeTopology. The
+    # subtree of node i is the slice [i, i + topology.size[i]), so crossover
+    # and mutation are slice operations. node_scores follows Node.score, with
+    # NaN for None; node 0 is the root, whose score is the plan score.
+
+    __slots__ = ("topology", "vertical", "order", "padding", "t", "node_scores")
+
+    def __init__(self, topology, vertical, order, padding, t, node_scores):
+        self.topology = topology
+        self.vertical = vertical
+        self.order = order
+        self.padding = padding
+        self.t = t
+        self.node_scores = node_scores
+
+    @staticmethod
+    def from_node(rootnode, topology):
+        vertical, order, padding, t = topology.encode([rootnode])
+        nodes = topology.preorder(rootnode)
+        node_scores = np.array([ np.nan if node.score is None else node.score for node in nodes ], dtype=np.float64)
+        return TreeGenome(topology, vertical[0], order[0], padding[0], t[0], node_scores)
+
+    def to_node(self):
+        topology = self.topology
+        nodes = [
+            Node(
+                t=float(self.t[i]),
+                children=[],
+                padding=bool(self.padding[i]),
+                room_indexes=list(topology.room_indexes[i]),
+                orientation=Orientation.Vertical if self.vertical[i] else Orientation.Horizontal,
+                order=int(self.order[i]),
+                score=None if np.isnan(self.node_scores[i]) else float(self.node_scores[i]),
+            )
+            for i in range(topology.num_nodes)
+        ]
+        for i in topology.internal:
+            nodes[i].children = [ nodes[c] for c in topology.children[i] ]
+        return nodes[0]
+
+    @property
+    def arrays(self):
+        # Everything but the topology, e.g. to send to another process
+        return self.vertical, self.order, self.padding, self.t, self.node_scores
+
+    def copy(self):
+        return TreeGenome(self.topology, self.vertical.copy(), self.order.copy(),
+            self.padding.copy(), self.t.copy(), self.node_scores.copy())
+
+    @property
+    def score(self):
+        return float(self.node_scores[0])
+
+    @score.setter
+    def score(self, value):
+        self.node_scores[0] = value
+
+    @property
+    def key(self):
+        return (self.topology.key, self.vertical.tobytes(), self.order.tobytes(), self.padding.tobytes(), self.t.tobytes())
+
+    @property
+    def selection_weights(self):
+        # Same as `1 - node.score if node.score else 1` on the Node tree
+        return [ 1 - score if score == score and score else 1 for score in self.node_scores.tolist() ]
+
+    def subtree(self, index):
+        return slice(index, index + self.topology.size[index])
+
+    def crossover(self, other, index):
+        # Takes the subtree at index from other. As with Node crossover, the
+        # node at index keeps its own score and its descendants bring theirs.
+        subtree = self.subtree(index)
+        self.vertical[subtree] = other.vertical[subtree]
+        self.order[subtree] = other.order[subtree]
+        self.padding[subtree] = other.padding[subtree]
+        self.t[subtree] = other.t[subtree]
+        self.node_scores[index + 1:subtree.stop] = other.node_scores[index + 1:subtree.stop]
+
+    def mutate(self, index, flip_order, flip_orientation, flip_padding):
+        subtree = self.subtree(index)
+        self.order[subtree] = np.where(flip_order, -self.order[subtree], self.order[subtree])
+        self.vertical[subtree] ^= flip_orientation
+        self.padding[subtree] ^= flip_padding
+        self.t[subtree] = np.minimum(np.maximum(self.t[subtree], 0.3), 0.7)
+
+    def apply_scores(self, node_scores):
+        # NaN in node_scores marks nodes scoring left alone
+        scored = ~np.isnan(node_scores)
+        self.node_scores[scored] = node_scores[scored]
+
+    @staticmethod
+    def stack(genomes):
+        return (
+            np.stack([ genome.vertical for genome in genomes ]),
+            np.stack([ genome.order for genome in genomes ]),
+            np.stack([ genome.padding for genome in genomes ]),
+            np.stack([ genome.t for genome in genomes ]),
+        )
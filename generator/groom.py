@@ -1,5 +1,6 @@
 from bakedrandom import brandom as random
 import string
+import numpy as np
 from recordclass import recordclass
 from core.edge import Orientation
 
@@ -31,6 +32,29 @@ default_tree_weights = {'Living_aspectRatioCap': 0.05, 'Hallway_fourNeighbors':
 TreeWeights = recordclass('TreeWeights', default_tree_weights.keys())
 
 
+# tree_score is split in two: tree_features reads what the rules need off a
+# room, and score_tree_features turns those features into the score. The
+# batch scorers compute the same features as arrays and pass them, with
+# weights that may be arrays too, to the same score_tree_features. These
+# helpers keep plain floats on the scalar path, where numpy scalars could
+# change the last bit of the score_floorplan results.
+
+def _minimum(a, b):
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.minimum(a, b)
+    return min(a, b)
+
+
+def _where(condition, a, b):
+    if isinstance(condition, np.ndarray):
+        return np.where(condition, a, b)
+    return a if condition else b
+
+
+def _capped(cap, min_aspect_ratio):
+    return _minimum(cap, min_aspect_ratio) / cap
+
+
 class Groom(object):
 
     def __init__(self, area, label):
@@ -39,6 +63,12 @@ class Groom(object):
         self.fill_color = "eeeeee"
 
     def tree_score(self, actual_room, weights):
+        return self.score_tree_features(self.tree_features(actual_room), weights)
+
+    def tree_features(self, actual_room):
+        return { 'min_aspect_ratio': actual_room.min_aspect_ratio }
+
+    def score_tree_features(self, features, weights):
         return 1.0
 
     def door_score(self, actual_room):
@@ -58,7 +88,7 @@ class JiltedGroom(Groom):
         # https://stackoverflow.com/questions/38963018/typeerror-super-takes-at-least-1-argument-0-given-error-is-specific-to-any
         super(JiltedGroom,self).__init__(0, "Jilted :(")
 
-    def tree_score(self, actual_room, weights):
+    def score_tree_features(self, features, weights):
         return 0.0
 
     def door_score(self, actual_room):
@@ -75,9 +105,8 @@ class LivingGroom(Groom):
     def tree_weight(self, weights):
         return weights.LivingGroom_weight
 
-    def tree_score(self, actual_room, weights):
-        aspectRatioCap = weights.Living_aspectRatioCap
-        return min(aspectRatioCap, actual_room.min_aspect_ratio) / aspectRatioCap
+    def score_tree_features(self, features, weights):
+        return _capped(weights.Living_aspectRatioCap, features['min_aspect_ratio'])
 
     def door_score(self, actual_room):
         return 1.0
@@ -93,25 +122,21 @@ class DiningGroom(LivingGroom):
     def tree_weight(self, weights):
         return weights.DiningGroom_weight
 
-    def get_tree_score_multiplier(self, actual_room, weights):
-
-        for n in actual_room.neighbors:
-            if type(n.groom) == KitchenGroom:
-                return weights.DiningGroom_nearKitchenMultiplier
-
-        for n in actual_room.neighbors:
-            if type(n.groom) == HallwayGroom:
-                for n2 in n.neighbors:
-                    if type(n2.groom) == KitchenGroom:
-                        return weights.DiningGroom_nearHallwayKitchenMultiplier
+    def tree_features(self, actual_room):
+        features = super(DiningGroom,self).tree_features(actual_room)
+        features['near_kitchen'] = any(type(n.groom) == KitchenGroom for n in actual_room.neighbors)
+        features['near_hallway_kitchen'] = any(
+            type(n.groom) == HallwayGroom and any(type(n2.groom) == KitchenGroom for n2 in n.neighbors)
+            for n in actual_room.neighbors
+        )
+        return features
 
-        return weights.DiningGroom_notNearKitchenMultiplier
-
-    def tree_score(self, actual_room, weights):
+    def score_tree_features(self, features, weights):
         aspectRatioCap = weights.Dining_aspectRatioCap
-        multiplier = self.get_tree_score_multiplier(actual_room, weights)
+        multiplier = _where(features['near_kitchen'], weights.DiningGroom_nearKitchenMultiplier,
+            _where(features['near_hallway_kitchen'], weights.DiningGroom_nearHallwayKitchenMultiplier, weights.DiningGroom_notNearKitchenMultiplier))
         # multiplier = 0.33
-        return multiplier * min(aspectRatioCap, actual_room.min_aspect_ratio) / aspectRatioCap
+        return multiplier * _minimum(aspectRatioCap, features['min_aspect_ratio']) / aspectRatioCap
 
     def door_score(self, actual_room):
         for neighbor, edge in actual_room.all_neighbors_and_edges:
@@ -139,9 +164,8 @@ class KitchenGroom(LivingGroom):
     def tree_weight(self, weights):
         return weights.KitchenGroom_weight
 
-    def tree_score(self, actual_room, weights):
-        aspectRatioCap = weights.Kitchen_aspectRatioCap
-        return min(aspectRatioCap, actual_room.min_aspect_ratio) / aspectRatioCap
+    def score_tree_features(self, features, weights):
+        return _capped(weights.Kitchen_aspectRatioCap, features['min_aspect_ratio'])
 
     def door_score(self, actual_room):
         for neighbor, edge in actual_room.all_neighbors_and_edges:
@@ -152,6 +176,9 @@ class KitchenGroom(LivingGroom):
 
 class HallwayGroom(Groom):
 
+    # Shorter walls do not count as a neighbour
+    min_neighbor_edge = 8
+
     def __init__(self):
         # https://stackoverflow.com/questions/38963018/typeerror-super-takes-at-least-1-argument-0-given-error-is-specific-to-any
         super(HallwayGroom,self).__init__(0, "")
@@ -161,22 +188,27 @@ class HallwayGroom(Groom):
 
     def tree_score(self, actual_room, weights):
         # return None
+        score = super(HallwayGroom,self).tree_score(actual_room, weights)
+        return None if score != score else score
 
+    def tree_features(self, actual_room):
         # Scored on the basis of how many non-hallway neighbors it has.
+        features = super(HallwayGroom,self).tree_features(actual_room)
         non_hall_neighbors = 0
         for neighbor, edge in actual_room.neighbors_and_edges:
-            if edge.length < 8:
+            if edge.length < HallwayGroom.min_neighbor_edge:
                 continue
             if type(neighbor.groom) is HallwayGroom:
                 continue
             non_hall_neighbors += 1
+        features['non_hall_neighbors'] = non_hall_neighbors
+        return features
 
-        if non_hall_neighbors >= 5:
-            return None
-        elif non_hall_neighbors == 4:
-            return weights.Hallway_fourNeighbors
-        elif non_hall_neighbors <= 3:
-            return 0
+    def score_tree_features(self, features, weights):
+        # NaN where tree_score is None, which leaves the room out of the plan
+        non_hall_neighbors = features['non_hall_neighbors']
+        return _where(non_hall_neighbors >= 5, float('nan'),
+            _where(non_hall_neighbors == 4, weights.Hallway_fourNeighbors, 0))
 
     def door_score(self, actual_room):
         return 1
@@ -190,35 +222,34 @@ class BedGroom(Groom):
         super(BedGroom,self).__init__(area, "Bedroom")
         self.fill_color = "d9ead3"
 
-    def tree_score(self, actual_room, weights):
-        multiplier = 1.0
+    def tree_features(self, actual_room):
+        features = super(BedGroom,self).tree_features(actual_room)
         non_bedgrooms = 0
 
         for neighbor, edge in actual_room.neighbors_and_edges:
-            if type(neighbor.groom) is HallwayGroom:
-                non_bedgrooms += 1
-            if type(neighbor.groom) is LivingGroom:
+            if type(neighbor.groom) in BedGroom.non_bedroom_grooms:
                 non_bedgrooms += 1
 
-        if non_bedgrooms == 0:
-            multiplier = weights.Bedroom_nonBedroomMultiplier
-
         is_blocking = False
 
         if not (actual_room.has_one_none_neighbor(Orientation.Vertical) and actual_room.has_one_none_neighbor(Orientation.Horizontal)):
             for orientation in [Orientation.Vertical, Orientation.Horizontal]:
                 if actual_room.has_one_none_neighbor(orientation):
                     for neighbor, edge in actual_room.neighbors_and_edges:
-                        if type(neighbor.groom) is BathGroom or type(neighbor.groom) is BedGroom:
+                        if type(neighbor.groom) in BedGroom.blocking_grooms:
                             if edge.orientation == orientation:
                                 if neighbor.has_one_none_neighbor(orientation):
                                     is_blocking = True
                                     break
 
-        if is_blocking:
-            multiplier *= weights.BedGroom_splittingHouseBlockerMultiplier
+        features['no_non_bedgrooms'] = non_bedgrooms == 0
+        features['is_blocking'] = is_blocking
+        return features
 
-        return multiplier * min(weights.Bedroom_aspectRatioCap, actual_room.min_aspect_ratio) / weights.Bedroom_aspectRatioCap
+    def score_tree_features(self, features, weights):
+        multiplier = _where(features['no_non_bedgrooms'], weights.Bedroom_nonBedroomMultiplier, 1.0)
+        multiplier = _where(features['is_blocking'], multiplier * weights.BedGroom_splittingHouseBlockerMultiplier, multiplier)
+        return multiplier * _minimum(weights.Bedroom_aspectRatioCap, features['min_aspect_ratio']) / weights.Bedroom_aspectRatioCap
 
     def tree_weight(self, weights):
         return weights.BedGroom_weight
@@ -265,8 +296,8 @@ class BathGroom(Groom):
         super(BathGroom,self).__init__(area, "Bath")
         self.fill_color = "cfe2f3"
 
-    def tree_score(self, actual_room, weights):
-        return min(weights.Bathroom_aspectRatioCap, actual_room.min_aspect_ratio) / weights.Bathroom_aspectRatioCap
+    def score_tree_features(self, features, weights):
+        return _capped(weights.Bathroom_aspectRatioCap, features['min_aspect_ratio'])
 
     def tree_weight(self, weights):
         return weights.BathGroom_weight
@@ -282,3 +313,10 @@ class BathGroom(Groom):
         if door_counter == 0:
             return 0
         return multiplier / door_counter
+
+
+# Neighbour types BedGroom's rules look for: a bedroom with none of the
+# first is cut off, and one of the second along an outside wall can make it
+# split the house
+BedGroom.non_bedroom_grooms = (HallwayGroom, LivingGroom)
+BedGroom.blocking_grooms = (BathGroom, BedGroom)
@@ -0,0 +1,114 @@
+from multiprocessing import Process, Pipe
+from random import Random
+
+from bakedrandom import brandom as random, RandomStream
+from generator.batch_evaluator import BatchTreeEvaluator, TreeTopology
+from generator.fitness_cache import FitnessCache
+from generator.genetic_tree_shaker import GenomeTreeShaker
+from generator.genome import TreeGenome
+from generator.rectangle_plan import RectangleTreeToFloorplan
+from generator.tree_judge import FloorplanEvaluator
+
+
+def _run_island(connection, rng, adam, list_o_rooms, width, height, weights,
+        num_migrations, generations_per_migration, num_migrants, shaker_kwargs):
+    shaker = GenomeTreeShaker(
+        adam,
+        list_o_rooms,
+        RectangleTreeToFloorplan(width, height, list_o_rooms, weights),
+        FloorplanEvaluator(weights),
+        batch_evaluator=BatchTreeEvaluator(width, height, list_o_rooms, weights),
+        fitness_cache=FitnessCache(),
+        rng=rng,
+        **shaker_kwargs
+    )
+
+    for migration in range(num_migrations):
+        for generation in range(generations_per_migration):
+            shaker.run_generation()
+
+        connection.send([ genome.arrays for genome in shaker.population[:num_migrants] ])
+        immigrants = connection.recv()
+        shaker.population.extend(TreeGenome(shaker.topology, *arrays) for arrays in immigrants)
+        shaker.filter_population()
+
+    connection.send([ genome.arrays for genome in shaker.population ])
+    connection.close()
+
+
+class IslandModel(object):
+
+    # Evolves num_islands GenomeTreeShaker populations in parallel processes.
+    # Every generations_per_migration generations each island sends its best
+    # num_migrants genomes to the next island on a ring. Islands share the
+    # tree shape of adam so migrants fit anywhere, and differ by their seeds.
+    # Migration is relayed in lock-step, so a seeded run is deterministic.
+    # Each island draws from its own stream, spawned from rng.
+
+    def __init__(self, adam, list_o_rooms, width, height, weights,
+            num_islands=4,
+            num_migrations=10,
+            generations_per_migration=5,
+            num_migrants=2,
+            rng=None,
+            **shaker_kwargs
+        ):
+        self.adam = adam
+        self.list_o_rooms = list_o_rooms
+        self.width = width
+        self.height = height
+        self.weights = weights
+        self.num_islands = num_islands
+        self.num_migrations = num_migrations
+        self.generations_per_migration = generations_per_migration
+        self.num_migrants = num_migrants
+        self.shaker_kwargs = shaker_kwargs
+        self.rng = rng or random
+        self.topology = TreeTopology(adam, list_o_rooms)
+        self.populations = []
+
+    def run(self):
+        if isinstance(self.rng, RandomStream):
+            island_rngs = self.rng.spawn(self.num_islands)
+        else:
+            island_rngs = [ Random(self.rng.getrandbits(64)) for i in range(self.num_islands) ]
+
+        connections = []
+        processes = []
+        for island_rng in island_rngs:
+            parent_end, island_end = Pipe()
+            process = Process(target=_run_island, args=(
+                island_end, island_rng, self.adam, self.list_o_rooms, self.width, self.height, self.weights,
+                self.num_migrations, self.generations_per_migration, self.num_migrants, self.shaker_kwargs,
+            ))
+            process.start()
+            island_end.close()
+            connections.append(parent_end)
+            processes.append(process)
+
+        try:
+            for migration in range(self.num_migrations):
+                emigrants = [ connection.recv() for connection in connections ]
+                for i, connection in enumerate(connections):
+                    connection.send(emigrants[i - 1])
+
+            self.populations = [
+                [ TreeGenome(self.topology, *arrays) for arrays in connection.recv() ]
+                for connection in connections
+            ]
+        finally:
+            # An island that dies leaves the others blocked on recv(), so
+            # nothing is left waiting for the parent before the join
+            for connection in connections:
+                connection.close()
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+
+        return self.best
+
+    @property
+    def best(self):
+        # Global best, the first island's on ties
+        return max((population[0] for population in self.populations), key=lambda genome: genome.score)
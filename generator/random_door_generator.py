@@ -1,7 +1,7 @@
-from bakedrandom import brandom as random
+from bakedrandom import brandom as random, coin_flips
 
 class RandomDoorGenerator(object):
 
     @staticmethod
-    def create_door_vector(length):
-        return [ random.choice([0, 1]) for i in range(length) ]
+    def create_door_vector(length, rng=None):
+        return [ int(flip) for flip in coin_flips(rng or random, length) ]
@@ -0,0 +1,441 @@
+from core.edge import Orientation
+from core.floorplan import FloorPlan
+from core.room import RoomFactory, InvalidSubdivisionException
+from generator.batch_evaluator import GROOM_KINDS
+from generator.groom import HallwayGroom, JiltedGroom, KitchenGroom
+from generator.subdivide_tree_generator import SubdivideTreeToFloorplan
+
+
+# Plans produced from subdivide trees are guillotine partitions of the lot
+# into axis-aligned rectangles. RectanglePlan instantiates them with plain
+# interval arithmetic instead of the polygon machinery, and exposes rooms
+# with the same interface the grooms score against. A real FloorPlan is
+# only built on demand by replaying the recorded subdivisions.
+
+
+class RectangleEdge(object):
+
+    __slots__ = ("positive", "negative", "length", "orientation", "doors")
+
+    def __init__(self, positive, negative, length, orientation):
+        self.positive = positive
+        self.negative = negative
+        self.length = length
+        self.orientation = orientation
+        self.doors = ()
+
+    def opposite_room(self, room):
+        if self.positive is room:
+            return self.negative
+        if self.negative is room:
+            return self.positive
+        raise Exception("Invalid opposite room request")
+
+
+class RectangleRoom(object):
+
+    __slots__ = ("plan", "x_min", "y_min", "x_max", "y_max", "groom", "_edges")
+
+    def __init__(self, plan, x_min, y_min, x_max, y_max):
+        self.plan = plan
+        self.x_min = x_min
+        self.y_min = y_min
+        self.x_max = x_max
+        self.y_max = y_max
+        self.groom = None
+        self._edges = None
+
+    @property
+    def max_min_xy(self):
+        return self.x_max, self.x_min, self.y_max, self.y_min
+
+    @property
+    def width(self):
+        return self.x_max - self.x_min
+
+    @property
+    def height(self):
+        return self.y_max - self.y_min
+
+    @property
+    def area(self):
+        return self.width * self.height
+
+    @property
+    def perimeter(self):
+        return 2 * (self.width + self.height)
+
+    @property
+    def min_aspect_ratio(self):
+        width = self.width
+        height = self.height
+        return min(
+            width / height, height / width
+        )
+
+    @property
+    def center(self):
+        return (self.x_max + self.x_min) * 0.5, (self.y_max + self.y_min) * 0.5
+
+    @property
+    def orientation(self):
+        return Orientation.Vertical if self.height > self.width else Orientation.Horizontal
+
+    def contains(self, p):
+        x, y = p
+        return self.x_min < x < self.x_max and self.y_min < y < self.y_max
+
+    @property
+    def all_neighbors_and_edges(self):
+        # Reset by the plan when a bordering room is split
+        if self._edges is None:
+            self._edges = self.plan.edges_of(self)
+        for edge in self._edges:
+            yield edge.opposite_room(self), edge
+
+    @property
+    def neighbors_and_edges(self):
+        for room, edge in self.all_neighbors_and_edges:
+            if room is not None:
+                yield room, edge
+
+    @property
+    def neighbors(self):
+        for n, e in self.neighbors_and_edges:
+            yield n
+
+    def has_one_none_neighbor(self, orientation):
+        count = 0
+        for n, e in self.all_neighbors_and_edges:
+            if e.orientation == orientation and n is None:
+                count += 1
+        return count == 1
+
+    def split(self, x, y, orientation):
+        # Same room ordering as Room.subdivide: a vertical cut puts the first
+        # room left of x, a horizontal cut puts it above y.
+        if not self.contains((x, y)):
+            raise InvalidSubdivisionException()
+
+        if orientation == Orientation.Vertical:
+            return (
+                (self.x_min, self.y_min, x, self.y_max),
+                (x, self.y_min, self.x_max, self.y_max),
+            )
+        return (
+            (self.x_min, y, self.x_max, self.y_max),
+            (self.x_min, self.y_min, self.x_max, y),
+        )
+
+    def proportional_subdivide(self, S_area_percentage, orientation, hallway=False):
+        # Mirrors Room.proportional_subdivide, returning rectangles
+        x, y = self.center
+        x_max, x_min, y_max, y_min = self.max_min_xy
+
+        if orientation == Orientation.Vertical:
+            x = (1 - S_area_percentage) * x_min + S_area_percentage * x_max
+        else:
+            y = (1 - S_area_percentage) * y_max + S_area_percentage * y_min
+
+        if not hallway:
+            x, y = round(x), round(y)
+            return self.split(x, y, orientation)
+
+        HALLWAY_WIDTH = 8
+
+        delta_1 = HALLWAY_WIDTH * S_area_percentage
+        delta_2 = HALLWAY_WIDTH * (1 - S_area_percentage)
+
+        if orientation == Orientation.Vertical:
+            x1, x2 = x - delta_1, x + delta_2
+            y1, y2 = y, y
+        else:
+            x1, x2 = x, x
+            y1, y2 = y + delta_2, y - delta_1
+
+        x1, x2, y1, y2 = map(round, [x1, x2, y1, y2])
+
+        if not self.contains((x1, y1)) or not self.contains((x2, y2)):
+            x, y = round(x), round(y)
+            rectA, rectB = self.split(x, y, orientation)
+            return rectA, rectB, None
+
+        rectA, rectB = self.split(x1, y1, orientation)
+        rectC, rectD = RectangleRoom(self.plan, *rectB).split(x2, y2, orientation)
+
+        return rectA, rectD, rectC
+
+
+class RectanglePlan(object):
+
+    def __init__(self, lot_width, lot_height, split_cache=None):
+        self.lot_width = lot_width
+        self.lot_height = lot_height
+        self.rooms = []
+        self.operations = []
+
+        # Split results by room rectangle and split parameters, shared by
+        # the plans of one instantiator so unchanged subtrees of other
+        # candidates are laid out without redoing the arithmetic
+        self.split_cache = split_cache
+
+        # rooms by the coordinate of each of their sides
+        self.x_min_sides = {}
+        self.x_max_sides = {}
+        self.y_min_sides = {}
+        self.y_max_sides = {}
+
+        self.lot_room = RectangleRoom(self, 0, 0, lot_width, lot_height)
+        self.add_room(self.lot_room)
+
+    def add_room(self, room):
+        self.rooms.append(room)
+        self.x_min_sides.setdefault(room.x_min, []).append(room)
+        self.x_max_sides.setdefault(room.x_max, []).append(room)
+        self.y_min_sides.setdefault(room.y_min, []).append(room)
+        self.y_max_sides.setdefault(room.y_max, []).append(room)
+
+    def remove_room(self, room):
+        self.rooms.remove(room)
+        self.x_min_sides[room.x_min].remove(room)
+        self.x_max_sides[room.x_max].remove(room)
+        self.y_min_sides[room.y_min].remove(room)
+        self.y_max_sides[room.y_max].remove(room)
+
+    def split_rects(self, S, direction, room, hallway):
+        if self.split_cache is None:
+            return room.proportional_subdivide(S, direction, hallway=hallway)
+
+        key = (room.x_min, room.y_min, room.x_max, room.y_max, S, direction, hallway)
+        rects = self.split_cache.get(key)
+        if rects is None:
+            try:
+                rects = room.proportional_subdivide(S, direction, hallway=hallway)
+            except InvalidSubdivisionException:
+                rects = ()
+            self.split_cache[key] = rects
+        if not rects:
+            raise InvalidSubdivisionException()
+        return rects
+
+    def proportional_subdivide(self, S, direction, room, hallway=False):
+        rects = self.split_rects(S, direction, room, hallway)
+        new_rooms = [ RectangleRoom(self, *rect) for rect in rects if rect is not None ]
+
+        self.clear_bordering_edges(room)
+        self.remove_room(room)
+        for new_room in new_rooms:
+            self.add_room(new_room)
+        self.operations.append((room, S, direction, hallway, new_rooms))
+
+        return tuple(new_rooms)
+
+    def clear_bordering_edges(self, room):
+        # Only rooms on the lines of a room's sides can border it
+        for others in (self.x_max_sides.get(room.x_min, ()), self.x_min_sides.get(room.x_max, ()),
+                self.y_max_sides.get(room.y_min, ()), self.y_min_sides.get(room.y_max, ())):
+            for other in others:
+                other._edges = None
+
+    def border_context(self, room):
+        # What the tree_score rules of rooms inside `room` can see outside
+        # it: every bordering room's rectangle and groom type, and whether a
+        # bordering hallway leads on to a kitchen
+        context = []
+        for others, vertical in ((self.x_max_sides.get(room.x_min, ()), True), (self.x_min_sides.get(room.x_max, ()), True),
+                (self.y_max_sides.get(room.y_min, ()), False), (self.y_min_sides.get(room.y_max, ()), False)):
+            for other in others:
+                if vertical:
+                    overlap = min(room.y_max, other.y_max) - max(room.y_min, other.y_min)
+                else:
+                    overlap = min(room.x_max, other.x_max) - max(room.x_min, other.x_min)
+                if overlap <= 0:
+                    continue
+                groom_type = type(other.groom)
+                near_kitchen = groom_type is HallwayGroom and any(type(n.groom) == KitchenGroom for n in other.neighbors)
+                context.append((other.x_min, other.y_min, other.x_max, other.y_max, groom_type, near_kitchen))
+        return frozenset(context)
+
+    def edges_of(self, room):
+        edges = []
+
+        for other in self.x_max_sides.get(room.x_min, ()):
+            self.append_shared_edge(edges, room, other, room.y_min, room.y_max, other.y_min, other.y_max, Orientation.Vertical)
+        for other in self.x_min_sides.get(room.x_max, ()):
+            self.append_shared_edge(edges, room, other, room.y_min, room.y_max, other.y_min, other.y_max, Orientation.Vertical)
+        for other in self.y_max_sides.get(room.y_min, ()):
+            self.append_shared_edge(edges, room, other, room.x_min, room.x_max, other.x_min, other.x_max, Orientation.Horizontal)
+        for other in self.y_min_sides.get(room.y_max, ()):
+            self.append_shared_edge(edges, room, other, room.x_min, room.x_max, other.x_min, other.x_max, Orientation.Horizontal)
+
+        if room.x_min == 0:
+            edges.append(RectangleEdge(room, None, room.height, Orientation.Vertical))
+        if room.x_max == self.lot_width:
+            edges.append(RectangleEdge(room, None, room.height, Orientation.Vertical))
+        if room.y_min == 0:
+            edges.append(RectangleEdge(room, None, room.width, Orientation.Horizontal))
+        if room.y_max == self.lot_height:
+            edges.append(RectangleEdge(room, None, room.width, Orientation.Horizontal))
+
+        return edges
+
+    @staticmethod
+    def append_shared_edge(edges, room, other, a_min, a_max, b_min, b_max, orientation):
+        overlap = min(a_max, b_max) - max(a_min, b_min)
+        if overlap > 0:
+            edges.append(RectangleEdge(room, other, overlap, orientation))
+
+    def to_floorplan(self):
+        fp = FloorPlan([RoomFactory.Rectangle(self.lot_width, self.lot_height)])
+        rooms = { self.lot_room: fp.rooms[0] }
+
+        for room, S, direction, hallway, new_rooms in self.operations:
+            split_rooms = fp.proportional_subdivide(S, direction, rooms.pop(room), hallway=hallway)
+            for new_room, split_room in zip(new_rooms, split_rooms):
+                rooms[new_room] = split_room
+
+        for room in self.rooms:
+            rooms[room].groom = room.groom
+
+        return fp
+
+
+class RectangleTreeToFloorplan(SubdivideTreeToFloorplan):
+
+    # Drop-in replacement for SubdivideTreeToFloorplan that instantiates the
+    # tree as a RectanglePlan. Scores and node scores are identical; call
+    # to_floorplan() on the result when a real FloorPlan is needed.
+    #
+    # Rooms of a subtree only see the rest of the plan through the rooms
+    # bordering its rectangle, and those do not change while the subtree is
+    # instantiated. So the outcome of a subtree, its splits, room grooms and
+    # node scores, is cached by the subtree, its rectangle and its border
+    # context, and replayed when a candidate repeats all three. A crossover
+    # or mutation then re-instantiates the changed branch and the subtrees
+    # whose borders it moved, and replays the rest. Subtrees are numbered
+    # by hash-consing, so keys stay small however deep the tree.
+
+    def __init__(self, lot_width, lot_height, list_o_rooms, weights,
+            split_cache_size=100000,
+            subtree_cache_size=100000,
+            subtree_min_rooms=4,
+        ):
+        super(RectangleTreeToFloorplan, self).__init__(lot_width, lot_height, list_o_rooms, weights)
+        self.split_cache = {}
+        self.split_cache_size = split_cache_size
+
+        # border_context covers what the known grooms' rules read; other
+        # groom types may look further, so they are never replayed
+        self.subtree_cache = None
+        if all(type(groom) in GROOM_KINDS for groom in list_o_rooms):
+            self.subtree_cache = {}
+        self.subtree_cache_size = subtree_cache_size
+        # Smaller subtrees are cheaper to redo than to look up
+        self.subtree_min_rooms = subtree_min_rooms
+        self.subtree_numbers = {}
+        self.subtree_hits = 0
+        self.subtree_misses = 0
+
+    def generate_candidate_floorplan(self, rootnode):
+        if len(self.split_cache) > self.split_cache_size:
+            self.split_cache.clear()
+        plan = RectanglePlan(self.lot_width, self.lot_height, self.split_cache)
+
+        if self.subtree_cache is not None:
+            if len(self.subtree_cache) > self.subtree_cache_size:
+                self.subtree_cache.clear()
+                self.subtree_numbers.clear()
+            # Preorder nodes of the candidate, their subtree numbers and the
+            # (preorder index, score) of every node score set, in order
+            self.nodes = []
+            self.node_indexes = {}
+            self.subtree_ids = []
+            self.score_log = []
+            self.number_subtree(rootnode)
+
+        self.subdivide_room(plan, plan.rooms[0], rootnode)
+        return plan
+
+    def number_subtree(self, node):
+        # Equal subtrees get equal numbers, across candidates
+        index = len(self.nodes)
+        self.nodes.append(node)
+        self.node_indexes[id(node)] = index
+        self.subtree_ids.append(None)
+
+        if len(node.children) <= 1:
+            shape = (tuple(node.room_indexes),)
+        else:
+            shape = (node.orientation, node.order, bool(node.padding), node.t, tuple(node.room_indexes),
+                self.number_subtree(node.children[0]), self.number_subtree(node.children[1]))
+        number = self.subtree_numbers.setdefault(shape, len(self.subtree_numbers))
+        self.subtree_ids[index] = number
+        return number
+
+    def subdivide_room(self, floorplan, room, node):
+        if self.subtree_cache is None:
+            return super(RectangleTreeToFloorplan, self).subdivide_room(floorplan, room, node)
+
+        index = self.node_indexes[id(node)]
+        if len(node.children) <= 1 or len(node.room_indexes) < self.subtree_min_rooms:
+            first_operation = len(floorplan.operations)
+            super(RectangleTreeToFloorplan, self).subdivide_room(floorplan, room, node)
+            # Leaves and jilted nodes are the ones scored
+            if len(floorplan.operations) == first_operation:
+                self.score_log.append((index, node.score))
+            return
+
+        key = (self.subtree_ids[index], room.x_min, room.y_min, room.x_max, room.y_max, floorplan.border_context(room))
+        entry = self.subtree_cache.get(key)
+        if entry is not None:
+            self.subtree_hits += 1
+            self.replay_subtree(floorplan, room, index, entry)
+            return
+        self.subtree_misses += 1
+
+        first_operation = len(floorplan.operations)
+        first_score = len(self.score_log)
+        super(RectangleTreeToFloorplan, self).subdivide_room(floorplan, room, node)
+        if len(floorplan.operations) == first_operation:
+            self.score_log.append((index, node.score))
+
+        self.subtree_cache[key] = self.record_subtree(
+            floorplan, room, index, floorplan.operations[first_operation:], self.score_log[first_score:])
+
+    @staticmethod
+    def record_subtree(plan, room, index, operations, scores):
+        # Splits refer to rooms by their number within the subtree, 0 being
+        # the subtree's own room; the rooms left at the end are the last
+        # ones appended to the plan, or the room itself if it was not split.
+        # Node scores refer to nodes by their preorder offset in the subtree.
+        numbers = { room: 0 }
+        recorded = []
+        for split_room, S, direction, hallway, new_rooms in operations:
+            recorded.append((numbers[split_room], S, direction, hallway, [ new_room.max_min_xy for new_room in new_rooms ]))
+            for new_room in new_rooms:
+                numbers[new_room] = len(numbers)
+
+        num_left = len(numbers) - len(operations)
+        left = plan.rooms[-num_left:] if operations else [room]
+        grooms = [ (numbers[r], type(r.groom) if type(r.groom) in (HallwayGroom, JiltedGroom) else r.groom) for r in left ]
+        return recorded, grooms, [ (i - index, score) for i, score in scores ]
+
+    def replay_subtree(self, plan, room, index, entry):
+        operations, grooms, scores = entry
+        rooms = [room]
+        for number, S, direction, hallway, rects in operations:
+            new_rooms = [ RectangleRoom(plan, x_min, y_min, x_max, y_max) for x_max, x_min, y_max, y_min in rects ]
+            plan.operations.append((rooms[number], S, direction, hallway, new_rooms))
+            rooms.extend(new_rooms)
+
+        if operations:
+            plan.clear_bordering_edges(room)
+            plan.remove_room(room)
+            for number, groom in grooms:
+                plan.add_room(rooms[number])
+        for number, groom in grooms:
+            rooms[number].groom = groom() if isinstance(groom, type) else groom
+
+        for offset, score in scores:
+            self.nodes[index + offset].score = score
+            self.score_log.append((index + offset, score))
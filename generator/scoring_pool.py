@@ -0,0 +1,68 @@
+import os
+from multiprocessing import Pool
+import numpy as np
+
+from generator.batch_evaluator import BatchTreeEvaluator, TreeTopology, apply_scores
+
+
+# Workers keep their evaluator between calls; the pool initializer builds it
+# once from the rooms, weights and lot size.
+_worker_evaluator = None
+
+
+def _init_worker(lot_width, lot_height, list_o_rooms, weights):
+    global _worker_evaluator
+    _worker_evaluator = BatchTreeEvaluator(lot_width, lot_height, list_o_rooms, weights)
+
+
+def _score_genomes(topology, vertical, order, padding, t):
+    return _worker_evaluator.score_arrays(topology, vertical, order, padding, t)
+
+
+class TreeScoringPool(object):
+
+    # Persistent process pool that scores GA candidates. Only the genome
+    # arrays and the (small) tree topology cross the process boundary; each
+    # worker scores a contiguous block of candidates and results come back in
+    # order, so scores do not depend on the number of workers.
+
+    def __init__(self, lot_width, lot_height, list_o_rooms, weights, processes=None):
+        self.list_o_rooms = list_o_rooms
+        # Fail here rather than in the workers for grooms without batch scoring
+        BatchTreeEvaluator(lot_width, lot_height, list_o_rooms, weights)
+
+        self.processes = processes or os.cpu_count()
+        self.pool = Pool(
+            self.processes,
+            initializer=_init_worker,
+            initargs=(lot_width, lot_height, list_o_rooms, weights),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def score_candidates(self, trees, topology=None):
+        if not trees:
+            return np.zeros(0)
+        topology = topology or TreeTopology(trees[0], self.list_o_rooms)
+        node_lists = [ TreeTopology.preorder(tree) for tree in trees ]
+        scores, node_scores = self.score_arrays(topology, *topology.encode_nodes(node_lists))
+        apply_scores(node_lists, scores, node_scores)
+        return scores
+
+    def score_arrays(self, topology, vertical, order, padding, t):
+        blocks = np.array_split(np.arange(len(vertical)), min(self.processes, len(vertical)))
+        results = self.pool.starmap(_score_genomes, [
+            (topology, vertical[block], order[block], padding[block], t[block]) for block in blocks
+        ])
+
+        scores = np.concatenate([ block_scores for block_scores, block_node_scores in results ])
+        node_scores = np.concatenate([ block_node_scores for block_scores, block_node_scores in results ])
+        return scores, node_scores
@@ -0,0 +1,100 @@
+from bisect import bisect_left
+from itertools import accumulate
+import numpy as np
+
+from bakedrandom import brandom as random, RandomStream, random_array
+
+
+class PrefixSampler(object):
+
+    # Weighted index sampling by bisecting prefix sums. sample() makes the
+    # same single rng.uniform draw as a linear scan over the weights, and
+    # picks the same index for it.
+
+    def __init__(self, weights):
+        self.cumulative = list(accumulate(weights))
+        self.total = sum(weights)
+
+    def sample(self, rng=None):
+        r = (rng or random).uniform(0, self.total)
+        return min(bisect_left(self.cumulative, r), len(self.cumulative) - 1)
+
+    def sample_many(self, size, rng=None):
+        r = random_array(rng or random, size) * self.total
+        return np.minimum(np.searchsorted(self.cumulative, r, side='left'), len(self.cumulative) - 1)
+
+
+class AliasSampler(object):
+
+    # Walker's alias method (Vose's construction): O(n) to build, then two
+    # draws per sample however many weights there are. Worth it when one
+    # distribution is sampled many times.
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        if not total:
+            # All weights zero: index 0, as PrefixSampler picks
+            self.probability = [ 0.0 ] * n
+            self.alias = [ 0 ] * n
+            return
+        scaled = [ w * n / total for w in weights ]
+        self.probability = [ 1.0 ] * n
+        self.alias = list(range(n))
+
+        small = [ i for i, p in enumerate(scaled) if p < 1.0 ]
+        large = [ i for i, p in enumerate(scaled) if p >= 1.0 ]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.probability[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+    def sample(self, rng=None):
+        rng = rng or random
+        i = min(int(rng.random() * len(self.alias)), len(self.alias) - 1)
+        return i if rng.random() < self.probability[i] else self.alias[i]
+
+    def sample_many(self, size, rng=None):
+        rng = rng or random
+        n = len(self.alias)
+        i = np.minimum((random_array(rng, size) * n).astype(np.intp), n - 1)
+        keep = random_array(rng, size) < np.asarray(self.probability)[i]
+        return np.where(keep, i, np.asarray(self.alias)[i])
+
+
+class PrefixRowSampler(object):
+
+    # PrefixSampler for every row of a 2D weight array, with the prefix sums
+    # of all rows taken at once. sample(row) makes the same draw as
+    # PrefixSampler(weights[row]).sample() and picks the same index.
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        self.cumulative = np.cumsum(weights, axis=-1)
+        self.totals = [ sum(row) for row in weights.tolist() ]
+
+    def sample(self, row, rng=None):
+        r = (rng or random).uniform(0, self.totals[row])
+        return min(int(np.searchsorted(self.cumulative[row], r, side='left')), self.cumulative.shape[-1] - 1)
+
+
+def uniform_indexes(n, size, rng=None):
+    # Indexes into a sequence of length n, as rng.choice would pick them
+    rng = rng or random
+    if isinstance(rng, RandomStream):
+        return rng.generator.integers(n, size=size)
+    return np.array([ rng.choice(range(n)) for i in range(int(np.prod(size))) ]).reshape(size)
+
+
+def weighted_rows(weights, rng=None):
+    # One prefix-sum sample per row of a 2D weight array
+    weights = np.asarray(weights, dtype=np.float64)
+    cumulative = np.cumsum(weights, axis=1)
+    r = random_array(rng or random, len(weights)) * cumulative[:, -1]
+    return np.minimum((cumulative < r[:, None]).sum(axis=1), weights.shape[1] - 1)
@@ -12,10 +12,11 @@ from collections import deque
 
 class SimpleGenerator(object):
 
-    def __init__(self, lot_width, lot_height, list_o_rooms):
+    def __init__(self, lot_width, lot_height, list_o_rooms, rng=None):
         self.lot_width = lot_width
         self.lot_height = lot_height
         self.desired_rooms = list_o_rooms
+        self.rng = rng or random
 
     def get_largest_room(self, rooms):
         return max(rooms, key=lambda r: r.area)
@@ -24,8 +25,8 @@ class SimpleGenerator(object):
         x, y = room.center
         std_dev = 0.15 * int(math.sqrt(room.area))
 
-        rx = int(random.gauss(x, std_dev))
-        ry = int(random.gauss(y, std_dev))
+        rx = int(self.rng.gauss(x, std_dev))
+        ry = int(self.rng.gauss(y, std_dev))
 
         return rx, ry
 
@@ -66,7 +67,7 @@ class SimpleGenerator(object):
                         used_rx.add(rx)
                         used_ry.add(ry)
 
-                floorplan.subdivide(corrected_rx, corrected_ry, random.choice([Orientation.Horizontal, Orientation.Vertical]))
+                floorplan.subdivide(corrected_rx, corrected_ry, self.rng.choice([Orientation.Horizontal, Orientation.Vertical]))
 
             self.add_doors_depth_first(floorplan)
             self.add_doors_minimum_spanning_tree(floorplan)
@@ -87,7 +88,7 @@ class SimpleGenerator(object):
                 if a is None:
                     continue
 
-                side = random.choice([a, b])
+                side = self.rng.choice([a, b])
 
                 current_ap = (current.area / current.perimeter)
                 neighbor_ap = (neighbor.area / neighbor.perimeter)
@@ -129,7 +130,7 @@ class SimpleGenerator(object):
                     if a is None:
                         continue
 
-                    side = random.choice([a, b])
+                    side = self.rng.choice([a, b])
 
                     current_ap = (roomA.area / roomA.perimeter)
                     neighbor_ap = (neighbor.area / neighbor.perimeter)
@@ -60,12 +60,15 @@ class SubdivideTreeToFloorplan(object):
 
 class SubdivideTreeGenerator(object):
 
+    def __init__(self, rng=None):
+        self.rng = rng or random
+
     def generate_tree_from_indexes(self, indexes):
         rootnode = Node(
-            orientation=random.choice([Orientation.Horizontal, Orientation.Vertical]),
+            orientation=self.rng.choice([Orientation.Horizontal, Orientation.Vertical]),
             children=[],
-            padding=random.choice([True, False]),
-            order=random.choice([-1, 1]),
+            padding=self.rng.choice([True, False]),
+            order=self.rng.choice([-1, 1]),
             t=0.5,
             room_indexes=list(indexes),
             score=None
@@ -84,19 +87,19 @@ class SubdivideTreeGenerator(object):
         # total_area = sum(areas)
         left, right = self.partition_list(rootnode.room_indexes)
         left_child = Node(
-            orientation=random.choice([Orientation.Horizontal, Orientation.Vertical]),
+            orientation=self.rng.choice([Orientation.Horizontal, Orientation.Vertical]),
             children=[],
-            padding=random.choice([True, False]),
-            order=random.choice([-1, 1]),
+            padding=self.rng.choice([True, False]),
+            order=self.rng.choice([-1, 1]),
             t=0.5,
             room_indexes=left,
             score=None
         )
         right_child = Node(
-            orientation=random.choice([Orientation.Horizontal, Orientation.Vertical]),
+            orientation=self.rng.choice([Orientation.Horizontal, Orientation.Vertical]),
             children=[],
-            padding=random.choice([True, False]),
-            order=random.choice([-1, 1]),
+            padding=self.rng.choice([True, False]),
+            order=self.rng.choice([-1, 1]),
             t=0.5,
             room_indexes=right,
             score=None
@@ -107,7 +110,7 @@ class SubdivideTreeGenerator(object):
 
     def partition_list(self, ls):
         ls = list(ls)
-        random.shuffle(ls)
+        self.rng.shuffle(ls)
 
         midpoint = len(ls) // 2
         return ls[:midpoint], ls[midpoint:]
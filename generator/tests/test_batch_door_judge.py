@@ -0,0 +1,55 @@
+import unittest
+import random as pyrandom
+from bakedrandom import brandom as random
+from generator.groom import *
+from generator.subdivide_tree_generator import SubdivideTreeGenerator
+from generator.rectangle_plan import RectangleTreeToFloorplan
+from generator.genetic_door_shaker import GeneticDoorShaker
+from generator.random_door_generator import RandomDoorGenerator
+from evaluator.door_judge import DoorJudge
+from evaluator.batch_door_judge import BatchDoorJudge
+
+
+class BatchDoorJudgeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(1.8), BedGroom(2.0), BathGroom(1), BathGroom(1)]
+        self.weights = TreeWeights(**default_tree_weights)
+
+    def make_floorplan(self, seed):
+        random.seed(seed)
+        adam = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(self.list_o_rooms)))
+        instantiator = RectangleTreeToFloorplan(120, 80, self.list_o_rooms, self.weights)
+        return instantiator.generate_candidate_floorplan(adam).to_floorplan()
+
+    def test_matches_door_judge(self):
+        rng = pyrandom.Random(0)
+        for seed in range(4):
+            fp = self.make_floorplan(seed)
+            judge = BatchDoorJudge(fp)
+            vectors = [ [ int(rng.random() < p) for e in fp.edges ] for p in [0.1, 0.3, 0.6, 0.9] for i in range(10) ]
+            scores = judge.score_vectors(vectors)
+            for vector, score in zip(vectors, scores):
+                dj = DoorJudge()
+                fp.clear_doors()
+                fp.add_doors(vector)
+                self.assertEqual(score, dj.score_connectivity(fp) + dj.score_individual_doors(fp))
+
+    def test_shaker_evolves_same_doors(self):
+        fp = self.make_floorplan(1)
+        populations = []
+        for batch_judge in [None, BatchDoorJudge(fp)]:
+            random.seed(2)
+            shaker = GeneticDoorShaker(fp, [ RandomDoorGenerator.create_door_vector(len(fp.edges)) for i in range(20) ], batch_judge=batch_judge)
+            for i in range(15):
+                shaker.run_generation()
+            populations.append([ (shaker.vector(c), c.score) for c in shaker.population ])
+        self.assertEqual(populations[0], populations[1])
+
+    def test_unknown_groom_type_raises(self):
+        class StudioGroom(LivingGroom):
+            pass
+
+        self.list_o_rooms[0] = StudioGroom(4)
+        with self.assertRaises(ValueError):
+            BatchDoorJudge(self.make_floorplan(0))
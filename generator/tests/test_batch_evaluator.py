@@ -0,0 +1,52 @@
+import unittest
+import copy
+from bakedrandom import brandom as random
+from core.edge import Orientation
+from generator.groom import *
+from generator.subdivide_tree_generator import SubdivideTreeGenerator
+from generator.rectangle_plan import RectangleTreeToFloorplan
+from generator.batch_evaluator import BatchTreeEvaluator, TreeTopology
+from generator.tree_judge import FloorplanEvaluator
+
+
+class BatchTreeEvaluatorTestCase(unittest.TestCase):
+
+    def test_matches_sequential_scoring(self):
+        random.seed(17)
+        list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(2.0), BathGroom(1), CustomGroom(1.5, "Study", "d3dfb8")]
+        weights = TreeWeights(**default_tree_weights)
+        evaluator = FloorplanEvaluator(weights)
+        instantiator = RectangleTreeToFloorplan(90, 60, list_o_rooms, weights)
+
+        adam = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(list_o_rooms)))
+        population = []
+        for i in range(30):
+            tree = copy.deepcopy(adam)
+            for node in TreeTopology.preorder(tree):
+                node.orientation = random.choice([Orientation.Horizontal, Orientation.Vertical])
+                node.order = random.choice([-1, 1])
+                node.padding = random.choice([True, False])
+                node.t = random.uniform(0.3, 0.7)
+                node.score = random.choice([None, 0.5])
+            population.append(tree)
+
+        expected = copy.deepcopy(population)
+        for tree in expected:
+            tree.score = evaluator.score_floorplan(instantiator.generate_candidate_floorplan(tree))
+
+        batch = BatchTreeEvaluator(90, 60, list_o_rooms, weights)
+        scores = batch.score_candidates(population)
+
+        self.assertEqual(list(scores), [tree.score for tree in expected])
+        for tree, expected_tree in zip(population, expected):
+            self.assertEqual(
+                [node.score for node in TreeTopology.preorder(tree)],
+                [node.score for node in TreeTopology.preorder(expected_tree)],
+            )
+
+    def test_unknown_groom_is_rejected(self):
+        class OtherGroom(Groom):
+            pass
+
+        with self.assertRaises(ValueError):
+            BatchTreeEvaluator(10, 10, [OtherGroom(1, "Other")], TreeWeights(**default_tree_weights))
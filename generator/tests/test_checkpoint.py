@@ -0,0 +1,71 @@
+import unittest
+import os
+import copy
+import tempfile
+from bakedrandom import brandom as random
+from generator.groom import *
+from generator.subdivide_tree_generator import SubdivideTreeGenerator
+from generator.rectangle_plan import RectangleTreeToFloorplan
+from generator.genetic_tree_shaker import GeneticTreeShaker, GenomeTreeShaker
+from generator.batch_evaluator import BatchTreeEvaluator
+from generator.tree_judge import FloorplanEvaluator
+from generator.checkpoint import Checkpointer, save_checkpoint, load_checkpoint
+
+
+class CheckpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(21)
+        self.list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(2.0), BathGroom(1), BathGroom(1)]
+        self.weights = TreeWeights(**default_tree_weights)
+        self.adam = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(self.list_o_rooms)))
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "checkpoint.pickle.gz")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_shaker(self, shaker_class):
+        return shaker_class(
+            copy.deepcopy(self.adam),
+            self.list_o_rooms,
+            RectangleTreeToFloorplan(120, 80, self.list_o_rooms, self.weights),
+            FloorplanEvaluator(self.weights),
+            batch_evaluator=BatchTreeEvaluator(120, 80, self.list_o_rooms, self.weights),
+            population_size=8,
+            num_crossovers=8,
+        )
+
+    def test_resumed_run_matches_uninterrupted(self):
+        for shaker_class in [GeneticTreeShaker, GenomeTreeShaker]:
+            random.seed(5)
+            shaker = self.make_shaker(shaker_class)
+            checkpointer = Checkpointer(self.filename, every=3)
+            for i in range(6):
+                shaker.run_generation()
+                if i == 2:
+                    checkpointer.after_generation(shaker)
+            expected = [ genome.score for genome in shaker.population ]
+
+            random.seed(99)
+            resumed = self.make_shaker(shaker_class)
+            self.assertTrue(checkpointer.resume(resumed))
+            self.assertEqual(resumed.generation, 3)
+            while resumed.generation < 6:
+                resumed.run_generation()
+            self.assertEqual([ genome.score for genome in resumed.population ], expected)
+
+    def test_resume_without_checkpoint(self):
+        shaker = self.make_shaker(GeneticTreeShaker)
+        self.assertFalse(Checkpointer(self.filename).resume(shaker))
+        self.assertEqual(shaker.generation, 0)
+
+    def test_rejects_other_shaker(self):
+        save_checkpoint(self.filename, self.make_shaker(GeneticTreeShaker))
+        with self.assertRaises(ValueError):
+            load_checkpoint(self.filename, self.make_shaker(GenomeTreeShaker))
+
+    def test_creates_checkpoint_directory(self):
+        filename = os.path.join(self.directory.name, "out", "checkpoint.pickle.gz")
+        save_checkpoint(filename, self.make_shaker(GeneticTreeShaker))
+        load_checkpoint(filename, self.make_shaker(GeneticTreeShaker))
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from bakedrandom import brandom as random
+from generator.groom import *
+from generator.subdivide_tree_generator import SubdivideTreeGenerator, SubdivideTreeToFloorplan
+from generator.tree_judge import DnaStore, FloorplanDNA, FloorplanEvaluator, save_floorplan, load_floorplan
+
+
+class DnaStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(0)
+        self.directory = tempfile.TemporaryDirectory()
+        list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BathGroom(1)]
+        self.filenames = []
+        for i in range(3):
+            rootnode = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(list_o_rooms)))
+            filename = os.path.join(self.directory.name, "floorplan-{}".format(i))
+            save_floorplan(FloorplanDNA(list_o_rooms=list_o_rooms, width=90, height=60, rootnode=rootnode, door_vector=[]), None, filename)
+            self.filenames.append(filename)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_loads_each_plan_once(self):
+        store = DnaStore()
+        fp = store.get(self.filenames[0] + ".svg")
+        self.assertIs(store.get(self.filenames[0] + ".svg"), fp)
+        self.assertIs(store.floorplan("floorplan-0"), fp)
+        self.assertEqual(list(store.dnas), ["floorplan-0"])
+        self.assertEqual(store.files["floorplan-0"], os.path.abspath(self.filenames[0]))
+
+    def test_same_id_in_two_directories(self):
+        store = DnaStore()
+        store.get(self.filenames[0] + ".svg")
+        other = os.path.join(self.directory.name, "other", "floorplan-0.svg")
+        with self.assertRaises(ValueError):
+            store.get(other)
+
+    def test_matches_fresh_instantiation(self):
+        store = DnaStore()
+        store.add_directory(self.directory.name)
+        self.assertEqual(sorted(store.files), ["floorplan-0", "floorplan-1", "floorplan-2"])
+
+        evaluator = FloorplanEvaluator(TreeWeights(**default_tree_weights))
+        for filename in self.filenames:
+            dna = load_floorplan(filename)
+            fp = SubdivideTreeToFloorplan(dna.width, dna.height, dna.list_o_rooms, TreeWeights(**default_tree_weights)).generate_candidate_floorplan(dna.rootnode)
+            self.assertEqual(evaluator.score_floorplan(store.floorplan(DnaStore.plan_id(filename))), evaluator.score_floorplan(fp))
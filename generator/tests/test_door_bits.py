@@ -0,0 +1,65 @@
+import unittest
+import random as pyrandom
+import numpy as np
+from bakedrandom import brandom as random
+from generator.groom import *
+from generator.subdivide_tree_generator import SubdivideTreeGenerator
+from generator.rectangle_plan import RectangleTreeToFloorplan
+from generator.genetic_door_shaker import GeneticDoorShaker
+from generator.random_door_generator import RandomDoorGenerator
+from generator.door_bits import pack_vector, unpack_vector, pack_rows, unpack_rows, crossover_bits, mutate_bits, DoorScoreCache
+
+
+class DoorBitsTestCase(unittest.TestCase):
+
+    def test_packing(self):
+        vector = [1, 0, 0, 1, 1, 0, 1, 0, 0, 0, 1]
+        bits = pack_vector(vector)
+        self.assertEqual(bits, 0b10001011001)
+        self.assertEqual(unpack_vector(bits, len(vector)), vector)
+        self.assertEqual(pack_rows([vector, [0] * 11]), [bits, 0])
+        self.assertEqual(unpack_rows([bits, 0], 11).tolist(), [ [ bool(v) for v in vector ], [False] * 11 ])
+
+    def test_packed_operators_match_lists(self):
+        rng = pyrandom.Random(7)
+        for length in [1, 8, 13, 40]:
+            for i in range(50):
+                a, b = [ [ rng.randint(0, 1) for e in range(length) ] for j in range(2) ]
+                from_b, flips = [ [ rng.random() < 0.5 for e in range(length) ] for j in range(2) ]
+
+                crossed = [ y if flip else x for x, y, flip in zip(a, b, from_b) ]
+                self.assertEqual(unpack_vector(crossover_bits(pack_vector(a), pack_vector(b), pack_vector(from_b)), length), crossed)
+                mutated = [ 1 - x if flip else x for x, flip in zip(a, flips) ]
+                self.assertEqual(unpack_vector(mutate_bits(pack_vector(a), pack_vector(flips)), length), mutated)
+
+    def test_evicted_hits_are_still_returned(self):
+        cache = DoorScoreCache(max_size=2)
+        doors = np.eye(4, dtype=bool)
+        keys = pack_rows(doors)
+
+        def score_parts(doors):
+            return doors.argmax(axis=1) * 1.0, doors.argmax(axis=1) * 2.0
+
+        cache.score_doors(keys[:2], doors[:2], score_parts)
+        scores = cache.score_doors([keys[0], keys[2], keys[3], keys[0]], doors[[0, 2, 3, 0]], score_parts)
+        self.assertEqual(scores, [(0.0, 0.0), (2.0, 4.0), (3.0, 6.0), (0.0, 0.0)])
+        self.assertEqual(len(cache), 2)
+
+    def test_cached_shaker_evolves_same_doors(self):
+        list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(2.0), BathGroom(1), BathGroom(1)]
+        weights = TreeWeights(**default_tree_weights)
+        random.seed(4)
+        adam = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(list_o_rooms)))
+        fp = RectangleTreeToFloorplan(120, 80, list_o_rooms, weights).generate_candidate_floorplan(adam).to_floorplan()
+
+        populations = []
+        for door_cache in [None, DoorScoreCache()]:
+            random.seed(2)
+            shaker = GeneticDoorShaker(fp, [ RandomDoorGenerator.create_door_vector(len(fp.edges)) for i in range(20) ], door_cache=door_cache)
+            for i in range(30):
+                shaker.run_generation()
+            populations.append([ (shaker.vector(c), c.score) for c in shaker.population ])
+
+        self.assertEqual(populations[0], populations[1])
+        self.assertGreater(door_cache.hits, 0)
+        self.assertLessEqual(len(door_cache), door_cache.misses)
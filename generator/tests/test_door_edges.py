@@ -0,0 +1,56 @@
+import unittest
+from bakedrandom import brandom as random
+from generator.groom import *
+from generator.subdivide_tree_generator import SubdivideTreeGenerator
+from generator.rectangle_plan import RectangleTreeToFloorplan
+from generator.genetic_door_shaker import GeneticDoorShaker
+from generator.random_door_generator import RandomDoorGenerator
+from generator.door_edges import DoorEdgeIndex
+from evaluator.batch_door_judge import BatchDoorJudge
+
+
+class DoorEdgeIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(1.8), BedGroom(2.0), BathGroom(1), BathGroom(1)]
+        weights = TreeWeights(**default_tree_weights)
+        # A seed whose plan has hallways sharing walls
+        random.seed(1)
+        adam = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(list_o_rooms)))
+        self.fp = RectangleTreeToFloorplan(120, 80, list_o_rooms, weights).generate_candidate_floorplan(adam).to_floorplan()
+
+    def test_genome_covers_eligible_edges(self):
+        index = DoorEdgeIndex(self.fp)
+        eligible = self.fp.edge_table.door_eligible(3.99)
+        self.assertGreater(len(index.open_ids), 0)
+        self.assertEqual(len(index) + len(index.open_ids), int(eligible.sum()))
+        self.assertLess(len(index), len(self.fp.edges))
+
+        for e in index.open_ids:
+            edge = self.fp.edges[e]
+            self.assertIs(type(edge.positive.groom), HallwayGroom)
+            self.assertIs(type(edge.negative.groom), HallwayGroom)
+
+        genome = [ i % 2 for i in range(len(index)) ]
+        vector = index.expand(genome)
+        self.assertEqual(len(vector), len(self.fp.edges))
+        self.assertEqual(index.compact(vector), genome)
+        for e, is_door in enumerate(vector):
+            if not eligible[e]:
+                self.assertEqual(is_door, 0)
+            elif e in index.open_ids:
+                self.assertEqual(is_door, 1)
+
+        self.assertEqual(len(DoorEdgeIndex(self.fp, open_hallways=False)), int(eligible.sum()))
+
+    def test_shaker_over_genomes(self):
+        index = DoorEdgeIndex(self.fp)
+        random.seed(3)
+        shaker = GeneticDoorShaker(self.fp, [ RandomDoorGenerator.create_door_vector(len(index)) for i in range(20) ],
+            batch_judge=BatchDoorJudge(self.fp), door_index=index)
+        for i in range(10):
+            shaker.run_generation()
+
+        self.assertEqual(len(shaker.vector(shaker.population[0])), len(index))
+        self.assertEqual(shaker.best_vector, index.expand(shaker.vector(shaker.population[0])))
+        self.assertEqual(BatchDoorJudge(self.fp).score_vectors([shaker.best_vector])[0], shaker.population[0].score)
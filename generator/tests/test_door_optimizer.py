@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+from bakedrandom import brandom as random
+from generator.groom import *
+from generator.subdivide_tree_generator import SubdivideTreeGenerator
+from generator.rectangle_plan import RectangleTreeToFloorplan
+from evaluator.door_judge import DoorJudge
+from evaluator.door_optimizer import DoorOptimizer
+
+
+class DoorOptimizerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(1.8), BedGroom(2.0), BathGroom(1), BathGroom(1)]
+        self.weights = TreeWeights(**default_tree_weights)
+
+    def make_floorplan(self, seed):
+        random.seed(seed)
+        adam = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(self.list_o_rooms)))
+        instantiator = RectangleTreeToFloorplan(120, 80, self.list_o_rooms, self.weights)
+        return instantiator.generate_candidate_floorplan(adam).to_floorplan()
+
+    def test_beats_random_sampling(self):
+        for seed in range(3):
+            fp = self.make_floorplan(seed)
+            optimizer = DoorOptimizer(fp)
+            vector = optimizer.optimize()
+            self.assertEqual(len(vector), len(fp.edges))
+
+            sampled = np.random.default_rng(seed).random((5000, len(fp.edges))) < 0.5
+            best_sampled = optimizer.objective(optimizer.judge.doors(sampled)).max()
+            self.assertGreaterEqual(optimizer.objective(optimizer.judge.doors([vector]))[0], best_sampled)
+
+    def test_create_perfect_doorplan(self):
+        fp = self.make_floorplan(3)
+        vector = DoorOptimizer(fp).optimize()
+
+        dj = DoorJudge()
+        dj.create_perfect_doorplan(fp)
+        self.assertEqual(list(fp.edge_table.door_counts), [ int(v and eligible) for v, eligible in zip(vector, fp.edge_table.door_eligible(3.99)) ])
+        self.assertEqual(dj.score_connectivity(fp), 1.0)
+
+    def test_best_step_matches_full_scoring(self):
+        fp = self.make_floorplan(1)
+        optimizer = DoorOptimizer(fp)
+        edges = optimizer.eligible_edges
+        rng = np.random.default_rng(1)
+        for i in range(20):
+            doors = optimizer.judge.doors(rng.random((1, len(fp.edges))) < rng.random())[0]
+            predicted, step = optimizer.best_step(doors)
+            self.assertAlmostEqual(predicted, optimizer.objective(step[None])[0])
+
+            # Every flip and every move, as whole door vectors
+            on, off = edges[doors[edges]], edges[~doors[edges]]
+            neighbors = np.repeat(doors[None], len(edges) + len(on) * len(off), axis=0)
+            neighbors[np.arange(len(edges)), edges] ^= True
+            moves = neighbors[len(edges):]
+            moves[np.arange(len(moves)), np.repeat(on, len(off))] = False
+            moves[np.arange(len(moves)), np.tile(off, len(on))] = True
+            self.assertAlmostEqual(predicted, optimizer.objective(neighbors).max())
@@ -0,0 +1,48 @@
+import unittest
+import copy
+from bakedrandom import brandom as random
+from generator.groom import *
+from generator.subdivide_tree_generator import SubdivideTreeGenerator
+from generator.rectangle_plan import RectangleTreeToFloorplan
+from generator.genetic_tree_shaker import GeneticTreeShaker
+from generator.tree_judge import FloorplanEvaluator
+from generator.fitness_cache import FitnessCache
+
+
+class FitnessCacheTestCase(unittest.TestCase):
+
+    def run_shaker(self, adam, list_o_rooms, fitness_cache):
+        weights = TreeWeights(**default_tree_weights)
+        random.seed(8)
+        shaker = GeneticTreeShaker(
+            copy.deepcopy(adam),
+            list_o_rooms,
+            RectangleTreeToFloorplan(120, 80, list_o_rooms, weights),
+            FloorplanEvaluator(weights),
+            fitness_cache=fitness_cache,
+        )
+        for i in range(8):
+            shaker.run_generation()
+        return [ [node.score for node in FitnessCache.list_nodes(tree)] for tree in shaker.population ]
+
+    def test_cached_run_matches_uncached_run(self):
+        random.seed(2)
+        list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BathGroom(1)]
+        adam = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(list_o_rooms)))
+
+        cache = FitnessCache()
+        self.assertEqual(self.run_shaker(adam, list_o_rooms, None), self.run_shaker(adam, list_o_rooms, cache))
+        self.assertGreater(cache.hits, 0)
+        self.assertEqual(cache.hits + cache.misses, 8 * 30)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = FitnessCache(max_size=2)
+        cache.put("a", (1.0,))
+        cache.put("b", (2.0,))
+        self.assertEqual(cache.get("a"), (1.0,))
+        cache.put("c", (3.0,))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), (3.0,))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
@@ -0,0 +1,58 @@
+import unittest
+import numpy as np
+from bakedrandom import brandom as random
+from generator.groom import *
+from generator.subdivide_tree_generator import SubdivideTreeGenerator, SubdivideTreeToFloorplan
+from generator.genetic_weight_frobber import GeneticWeightFrobber
+from generator.tree_judge import FloorplanEvaluator
+from generator.frob_features import PlanFeatures
+
+
+class StudioGroom(LivingGroom):
+
+    # A groom type the frobber has no special handling for
+
+    def score_tree_features(self, features, weights):
+        return 0.5 * super(StudioGroom,self).score_tree_features(features, weights)
+
+
+class PlanFeaturesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(0)
+        list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(1.8), BedGroom(2.0), BathGroom(1), BathGroom(1), CustomGroom(1.5, "Den", "f7e1d7")]
+        instantiator = SubdivideTreeToFloorplan(120, 80, list_o_rooms, TreeWeights(**default_tree_weights))
+        self.plans = [
+            instantiator.generate_candidate_floorplan(SubdivideTreeGenerator().generate_tree_from_indexes(range(len(list_o_rooms))))
+            for i in range(12)
+        ]
+        frobber = GeneticWeightFrobber(default_tree_weights, [], use_features=False)
+        self.weight_sets = [ default_tree_weights ] + [ frobber.mutate_individual(default_tree_weights) for i in range(8) ]
+
+    def test_matches_score_floorplan(self):
+        scores = PlanFeatures(self.plans).score(self.weight_sets)
+        expected = [ [ FloorplanEvaluator(TreeWeights(**weights)).score_floorplan(fp) for fp in self.plans ] for weights in self.weight_sets ]
+        np.testing.assert_allclose(scores, expected, rtol=0, atol=1e-12)
+
+    def test_frobber_scores_like_evaluate_candidate(self):
+        pairs = [ (self.plans[i], self.plans[(i * 5 + 3) % len(self.plans)]) for i in range(len(self.plans)) ]
+        frobber = GeneticWeightFrobber(default_tree_weights, pairs)
+        for weights, (correct, accuracy) in zip(self.weight_sets, frobber.evaluate_weights(self.weight_sets)):
+            expected_correct, expected_accuracy = frobber.evaluate_candidate(FloorplanEvaluator(TreeWeights(**weights)))
+            self.assertEqual(correct, expected_correct)
+            self.assertAlmostEqual(accuracy, expected_accuracy, places=10)
+
+        frobber.run_generation()
+        self.assertEqual(len(frobber.population), frobber.population_size)
+
+    def test_scores_grooms_by_their_own_rules(self):
+        random.seed(3)
+        list_o_rooms = [StudioGroom(4), KitchenGroom(2), BedGroom(1.8), BathGroom(1)]
+        instantiator = SubdivideTreeToFloorplan(90, 60, list_o_rooms, TreeWeights(**default_tree_weights))
+        plans = [
+            instantiator.generate_candidate_floorplan(SubdivideTreeGenerator().generate_tree_from_indexes(range(len(list_o_rooms))))
+            for i in range(4)
+        ]
+        scores = PlanFeatures(plans).score(self.weight_sets)
+        expected = [ [ FloorplanEvaluator(TreeWeights(**weights)).score_floorplan(fp) for fp in plans ] for weights in self.weight_sets ]
+        np.testing.assert_allclose(scores, expected, rtol=0, atol=1e-12)
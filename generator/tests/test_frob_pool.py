@@ -0,0 +1,33 @@
+import unittest
+from bakedrandom import brandom as random
+from generator.groom import *
+from generator.subdivide_tree_generator import SubdivideTreeGenerator, SubdivideTreeToFloorplan
+from generator.genetic_weight_frobber import GeneticWeightFrobber
+from generator.tree_judge import FloorplanEvaluator
+
+
+class FrobberPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(0)
+        list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(1.8), BathGroom(1)]
+        instantiator = SubdivideTreeToFloorplan(100, 70, list_o_rooms, TreeWeights(**default_tree_weights))
+        plans = [
+            instantiator.generate_candidate_floorplan(SubdivideTreeGenerator().generate_tree_from_indexes(range(len(list_o_rooms))))
+            for i in range(6)
+        ]
+        self.pairs = [ (plans[i], plans[(i + 1) % len(plans)]) for i in range(len(plans)) ]
+
+    def test_pool_scores_like_evaluate_candidate(self):
+        frobber = GeneticWeightFrobber(default_tree_weights, self.pairs, use_features=False, processes=2)
+        weight_sets = [ default_tree_weights ] + [ frobber.mutate_individual(default_tree_weights) for i in range(4) ]
+        try:
+            for generation in range(2):
+                pool = frobber.pool
+                for weights, score in frobber.score_candidates(weight_sets):
+                    self.assertEqual(score, frobber.evaluate_candidate(FloorplanEvaluator(TreeWeights(**weights))))
+                if generation:
+                    self.assertIs(frobber.pool, pool)
+        finally:
+            frobber.close()
+        self.assertIsNone(frobber.pool)
@@ -0,0 +1,69 @@
+import unittest
+import copy
+import math
+from bakedrandom import brandom as random
+from generator.groom import *
+from generator.subdivide_tree_generator import SubdivideTreeGenerator
+from generator.rectangle_plan import RectangleTreeToFloorplan
+from generator.genetic_tree_shaker import GeneticTreeShaker, GenomeTreeShaker
+from generator.batch_evaluator import BatchTreeEvaluator, TreeTopology
+from generator.tree_judge import FloorplanEvaluator
+from generator.genome import TreeGenome
+
+
+def describe(tree):
+    return [
+        (n.orientation, n.order, n.padding, n.t, n.room_indexes, len(n.children), n.score)
+        for n in TreeTopology.preorder(tree)
+    ]
+
+
+class TreeGenomeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(21)
+        self.list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(2.0), BathGroom(1), BathGroom(1)]
+        self.weights = TreeWeights(**default_tree_weights)
+        self.adam = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(self.list_o_rooms)))
+
+    def test_node_round_trip(self):
+        self.adam.score = 0.25
+        topology = TreeTopology(self.adam, self.list_o_rooms)
+        genome = TreeGenome.from_node(self.adam, topology)
+        self.assertEqual(describe(genome.to_node()), describe(self.adam))
+        self.assertEqual(genome.score, 0.25)
+
+    def test_crossover_takes_subtree_slice(self):
+        topology = TreeTopology(self.adam, self.list_o_rooms)
+        a = TreeGenome.from_node(self.adam, topology)
+        b = a.copy()
+        b.vertical[:] = ~b.vertical
+        b.node_scores[:] = 0.5
+
+        child = topology.children[0, 1]
+        a.crossover(b, child)
+        subtree = a.subtree(child)
+        self.assertTrue((a.vertical[subtree] == b.vertical[subtree]).all())
+        self.assertTrue((a.vertical[:child] != b.vertical[:child]).all())
+        self.assertTrue(math.isnan(a.node_scores[child]))
+        self.assertTrue((a.node_scores[child + 1:subtree.stop] == 0.5).all())
+
+    def test_matches_node_shaker(self):
+        populations = []
+        for shaker_class in [GeneticTreeShaker, GenomeTreeShaker]:
+            random.seed(3)
+            shaker = shaker_class(
+                copy.deepcopy(self.adam),
+                self.list_o_rooms,
+                RectangleTreeToFloorplan(120, 80, self.list_o_rooms, self.weights),
+                FloorplanEvaluator(self.weights),
+                batch_evaluator=BatchTreeEvaluator(120, 80, self.list_o_rooms, self.weights),
+            )
+            for i in range(10):
+                shaker.run_generation()
+            populations.append([
+                describe(tree.to_node() if isinstance(tree, TreeGenome) else tree)
+                for tree in shaker.population
+            ])
+
+        self.assertEqual(populations[0], populations[1])
@@ -0,0 +1,67 @@
+import multiprocessing
+import unittest
+from unittest import mock
+from bakedrandom import brandom as random
+from generator.groom import *
+from generator.subdivide_tree_generator import SubdivideTreeGenerator
+import generator.islands
+from generator.islands import IslandModel, _run_island
+
+
+class IslandModelTestCase(unittest.TestCase):
+
+    def run_islands(self, adam, list_o_rooms):
+        random.seed(6)
+        islands = IslandModel(
+            adam, list_o_rooms, 120, 80, TreeWeights(**default_tree_weights),
+            num_islands=3, num_migrations=3, generations_per_migration=2,
+        )
+        best = islands.run()
+        return islands, best
+
+    def test_seeded_run_is_deterministic(self):
+        random.seed(1)
+        list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BathGroom(1)]
+        adam = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(list_o_rooms)))
+
+        islands, best = self.run_islands(adam, list_o_rooms)
+        again, best_again = self.run_islands(adam, list_o_rooms)
+
+        self.assertEqual(len(islands.populations), 3)
+        self.assertEqual(best.score, max(population[0].score for population in islands.populations))
+        self.assertEqual(best.key, best_again.key)
+        self.assertEqual(
+            [[genome.score for genome in population] for population in islands.populations],
+            [[genome.score for genome in population] for population in again.populations],
+        )
+
+    def test_dead_island_does_not_hang_run(self):
+        if multiprocessing.get_start_method() != 'fork':
+            self.skipTest("the failing island is patched in by fork")
+
+        random.seed(1)
+        list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BathGroom(1)]
+        adam = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(list_o_rooms)))
+        islands = IslandModel(
+            adam, list_o_rooms, 120, 80, TreeWeights(**default_tree_weights),
+            num_islands=3, num_migrations=3, generations_per_migration=2,
+        )
+
+        _started.value = 0
+        with mock.patch.object(generator.islands, '_run_island', _run_or_fail):
+            with self.assertRaises(EOFError):
+                islands.run()
+        self.assertEqual(multiprocessing.active_children(), [])
+
+
+# Islands started after this count up, and the second one to start dies
+_started = multiprocessing.Value('i', 0)
+
+
+def _run_or_fail(connection, *args):
+    with _started.get_lock():
+        _started.value += 1
+        island = _started.value
+    if island == 2:
+        raise RuntimeError("island died")
+    _run_island(connection, *args)
@@ -0,0 +1,91 @@
+import unittest
+import copy
+from bakedrandom import brandom as random
+from generator.groom import *
+from generator.subdivide_tree_generator import SubdivideTreeGenerator, SubdivideTreeToFloorplan
+from generator.rectangle_plan import RectangleTreeToFloorplan
+from generator.tree_judge import FloorplanEvaluator
+
+
+def list_nodes(node):
+    nodes = [node]
+    for child in node.children:
+        nodes.extend(list_nodes(child))
+    return nodes
+
+
+class RectanglePlanTestCase(unittest.TestCase):
+
+    def test_matches_polygon_instantiation(self):
+        random.seed(11)
+        list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(1.8), BedGroom(2.0), BathGroom(1), BathGroom(1)]
+        weights = TreeWeights(**default_tree_weights)
+        evaluator = FloorplanEvaluator(weights)
+        polygons = SubdivideTreeToFloorplan(120, 80, list_o_rooms, weights)
+        rectangles = RectangleTreeToFloorplan(120, 80, list_o_rooms, weights)
+
+        for i in range(40):
+            tree = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(list_o_rooms)))
+            for node in list_nodes(tree):
+                node.t = random.uniform(0.1, 0.9)
+            tree_copy = copy.deepcopy(tree)
+
+            fp = polygons.generate_candidate_floorplan(tree)
+            plan = rectangles.generate_candidate_floorplan(tree_copy)
+
+            self.assertEqual(evaluator.score_floorplan(fp), evaluator.score_floorplan(plan))
+            self.assertEqual([n.score for n in list_nodes(tree)], [n.score for n in list_nodes(tree_copy)])
+
+            replayed = plan.to_floorplan()
+            self.assertEqual([r.max_min_xy for r in fp.rooms], [r.max_min_xy for r in replayed.rooms])
+            self.assertEqual([type(r.groom) for r in fp.rooms], [type(r.groom) for r in replayed.rooms])
+            self.assertEqual(len(fp.edges), len(replayed.edges))
+
+    def test_split_cache_reuses_unchanged_subtrees(self):
+        random.seed(12)
+        list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(2.0), BathGroom(1)]
+        weights = TreeWeights(**default_tree_weights)
+        evaluator = FloorplanEvaluator(weights)
+        polygons = SubdivideTreeToFloorplan(100, 70, list_o_rooms, weights)
+        rectangles = RectangleTreeToFloorplan(100, 70, list_o_rooms, weights)
+
+        tree = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(list_o_rooms)))
+        rectangles.generate_candidate_floorplan(copy.deepcopy(tree))
+        cached_splits = len(rectangles.split_cache)
+
+        # Flip one leaf-level split; everything above it is served from cache
+        variant = copy.deepcopy(tree)
+        deepest = [n for n in list_nodes(variant) if n.children and not any(c.children for c in n.children)][0]
+        deepest.order *= -1
+        variant_copy = copy.deepcopy(variant)
+
+        plan = rectangles.generate_candidate_floorplan(variant)
+        fp = polygons.generate_candidate_floorplan(variant_copy)
+        self.assertLessEqual(len(rectangles.split_cache), cached_splits + 1)
+        self.assertEqual(evaluator.score_floorplan(fp), evaluator.score_floorplan(plan))
+        self.assertEqual([n.score for n in list_nodes(variant)], [n.score for n in list_nodes(variant_copy)])
+
+    def test_replays_unchanged_subtrees(self):
+        random.seed(13)
+        list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(1.8), BedGroom(2.0), BathGroom(1), BathGroom(1)] * 2
+        weights = TreeWeights(**default_tree_weights)
+        evaluator = FloorplanEvaluator(weights)
+        polygons = SubdivideTreeToFloorplan(200, 150, list_o_rooms, weights)
+        rectangles = RectangleTreeToFloorplan(200, 150, list_o_rooms, weights)
+
+        tree = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(list_o_rooms)))
+        rectangles.generate_candidate_floorplan(copy.deepcopy(tree))
+        for node in list_nodes(tree):
+            if len(node.room_indexes) < len(list_o_rooms) and node.children:
+                variant = copy.deepcopy(tree)
+                changed = [ n for n in list_nodes(variant) if n.room_indexes == node.room_indexes ][0]
+                changed.order *= -1
+                variant_copy = copy.deepcopy(variant)
+
+                plan = rectangles.generate_candidate_floorplan(variant)
+                fp = polygons.generate_candidate_floorplan(variant_copy)
+                self.assertEqual(evaluator.score_floorplan(fp), evaluator.score_floorplan(plan))
+                self.assertEqual([n.score for n in list_nodes(variant)], [n.score for n in list_nodes(variant_copy)])
+                self.assertEqual([r.max_min_xy for r in fp.rooms], [r.max_min_xy for r in plan.to_floorplan().rooms])
+
+        self.assertGreater(rectangles.subtree_hits, 0)
@@ -0,0 +1,46 @@
+import unittest
+import pickle
+from bakedrandom import RandomStream, random_array, coin_flips
+from generator.subdivide_tree_generator import SubdivideTreeGenerator
+from generator.random_door_generator import RandomDoorGenerator
+from generator.tree_judge import PopulationCentrifuge, GeneratorParams
+
+
+def run_centrifuge(**kwargs):
+    fp = PopulationCentrifuge(GeneratorParams(num_generations=2, inner_iter=4, door_iter=10, seed=11, **kwargs)).create_perfect_floorplan()
+    return [ r.max_min_xy for r in fp.rooms ], [ len(e.doors) for e in fp.edges ]
+
+
+class RandomStreamTestCase(unittest.TestCase):
+
+    def test_spawned_streams_are_reproducible(self):
+        a = [ stream.random() for stream in RandomStream(5).spawn(3) ]
+        b = [ stream.random() for stream in RandomStream(5).spawn(3) ]
+        self.assertEqual(a, b)
+        self.assertEqual(len(set(a)), 3)
+
+    def test_state_round_trip(self):
+        stream = RandomStream(5)
+        stream.random()
+        stream.generator.random(4)
+        state = stream.getstate()
+        expected = (stream.random(), list(random_array(stream, 4)))
+
+        stream.setstate(state)
+        self.assertEqual((stream.random(), list(random_array(stream, 4))), expected)
+
+        clone = pickle.loads(pickle.dumps(stream))
+        self.assertEqual(clone.random(), stream.random())
+        self.assertEqual(list(coin_flips(clone, 8)), list(coin_flips(stream, 8)))
+
+    def test_generators_take_a_stream(self):
+        tree = SubdivideTreeGenerator(RandomStream(2)).generate_tree_from_indexes(range(6))
+        same = SubdivideTreeGenerator(RandomStream(2)).generate_tree_from_indexes(range(6))
+        self.assertEqual(pickle.dumps(tree), pickle.dumps(same))
+        self.assertEqual(
+            RandomDoorGenerator.create_door_vector(20, RandomStream(2)),
+            RandomDoorGenerator.create_door_vector(20, RandomStream(2)),
+        )
+
+    def test_seeded_run_ignores_process_count(self):
+        self.assertEqual(run_centrifuge(processes=1), run_centrifuge(processes=2))
@@ -0,0 +1,58 @@
+import unittest
+import copy
+from unittest import mock
+from bakedrandom import brandom as random
+from core.edge import Orientation
+from generator.groom import *
+from generator.subdivide_tree_generator import SubdivideTreeGenerator
+from generator.batch_evaluator import BatchTreeEvaluator, TreeTopology
+from generator.scoring_pool import TreeScoringPool
+from generator.genetic_tree_shaker import GenomeTreeShaker
+from generator.tree_judge import PopulationCentrifuge, GeneratorParams
+
+
+class TreeScoringPoolTestCase(unittest.TestCase):
+
+    def test_matches_in_process_scoring(self):
+        random.seed(5)
+        list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(2.0), BathGroom(1)]
+        weights = TreeWeights(**default_tree_weights)
+
+        adam = SubdivideTreeGenerator().generate_tree_from_indexes(range(len(list_o_rooms)))
+        population = []
+        for i in range(11):
+            tree = copy.deepcopy(adam)
+            for node in TreeTopology.preorder(tree):
+                node.orientation = random.choice([Orientation.Horizontal, Orientation.Vertical])
+                node.order = random.choice([-1, 1])
+                node.padding = random.choice([True, False])
+            population.append(tree)
+
+        expected = copy.deepcopy(population)
+        BatchTreeEvaluator(120, 80, list_o_rooms, weights).score_candidates(expected)
+
+        with TreeScoringPool(120, 80, list_o_rooms, weights, processes=3) as pool:
+            pool.score_candidates(population)
+
+        for tree, expected_tree in zip(population, expected):
+            self.assertEqual(
+                [node.score for node in TreeTopology.preorder(tree)],
+                [node.score for node in TreeTopology.preorder(expected_tree)],
+            )
+
+    def test_failed_run_closes_pool(self):
+        closed = []
+
+        class RecordingPool(TreeScoringPool):
+            def close(self):
+                closed.append(self)
+                TreeScoringPool.close(self)
+
+        def fail(shaker):
+            raise RuntimeError("generation failed")
+
+        centrifuge = PopulationCentrifuge(GeneratorParams(processes=2, num_generations=1, inner_iter=1, seed=0))
+        with mock.patch('generator.tree_judge.TreeScoringPool', RecordingPool), mock.patch.object(GenomeTreeShaker, 'run_generation', fail):
+            with self.assertRaises(RuntimeError):
+                centrifuge.create_perfect_floorplan()
+        self.assertEqual(len(closed), 1)
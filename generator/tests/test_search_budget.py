@@ -0,0 +1,55 @@
+import unittest
+from bakedrandom import brandom as random
+from generator.tree_judge import PopulationCentrifuge, GeneratorParams, SearchBudget
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SearchBudgetTestCase(unittest.TestCase):
+
+    def test_budget_shares(self):
+        clock = FakeClock()
+        budget = SearchBudget(seconds=10, door_share=0.25, clock=clock)
+        budget.start()
+        clock.now = 7
+        self.assertFalse(budget.tree_exhausted)
+        clock.now = 7.5
+        self.assertTrue(budget.tree_exhausted)
+        self.assertFalse(budget.door_exhausted)
+        clock.now = 10
+        self.assertTrue(budget.door_exhausted)
+
+        budget = SearchBudget(evaluations=100, door_share=0.5)
+        budget.start()
+        budget.charge(50)
+        self.assertTrue(budget.tree_exhausted)
+        self.assertFalse(budget.door_exhausted)
+
+    def test_search_stays_within_evaluation_budget(self):
+        random.seed(4)
+        centrifuge = PopulationCentrifuge(GeneratorParams(num_generations=20, inner_iter=50, door_iter=100))
+        progress = list(centrifuge.search(SearchBudget(evaluations=600)))
+
+        tree_scores = [ p.score for p in progress if p.phase == 'tree' ]
+        self.assertEqual(tree_scores, sorted(tree_scores))
+        self.assertEqual(progress[-1].phase, 'done')
+        self.assertEqual(progress[-1].score, tree_scores[-1])
+        # Checked between generations, so at most one generation over
+        self.assertLessEqual(progress[-1].evaluations, 600 + 30)
+        self.assertEqual(len(progress[-1].door_vector), len(progress[-1].floorplan.edges))
+
+    def test_search_without_budget_yields_nothing(self):
+        random.seed(4)
+        centrifuge = PopulationCentrifuge(GeneratorParams(num_generations=3, inner_iter=5, door_iter=10))
+        self.assertEqual(list(centrifuge.search(SearchBudget(evaluations=0))), [])
+        self.assertIsNone(centrifuge.create_budgeted_floorplan(SearchBudget(seconds=0)))
+
+        for params in [GeneratorParams(num_generations=0), GeneratorParams(inner_iter=0)]:
+            self.assertEqual(list(PopulationCentrifuge(params).search(SearchBudget(evaluations=600))), [])
@@ -0,0 +1,61 @@
+import unittest
+import random as pyrandom
+import numpy as np
+from bakedrandom import RandomStream
+from generator.selection import PrefixSampler, AliasSampler, PrefixRowSampler, uniform_indexes, weighted_rows
+
+
+def linear_scan(weights, rng):
+    r = rng.uniform(0, sum(weights))
+    upto = 0
+    for i, w in enumerate(weights):
+        if upto + w >= r:
+            return i
+        upto += w
+
+
+class SelectionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.weights = [1, 0.25, 1, 0.7, 0, 1, 0.4815, 1]
+
+    def test_prefix_sampler_matches_linear_scan(self):
+        a, b = pyrandom.Random(4), pyrandom.Random(4)
+        sampler = PrefixSampler(self.weights)
+        for i in range(2000):
+            self.assertEqual(sampler.sample(a), linear_scan(self.weights, b))
+
+    def test_samplers_follow_weights(self):
+        expected = np.array(self.weights) / sum(self.weights)
+        for sampler in [PrefixSampler(self.weights), AliasSampler(self.weights)]:
+            counts = np.bincount(sampler.sample_many(200000, RandomStream(8)), minlength=len(self.weights))
+            np.testing.assert_allclose(counts / 200000, expected, atol=0.005)
+            self.assertEqual(counts[4], 0)
+
+        alias = AliasSampler(self.weights)
+        rng = RandomStream(9)
+        counts = np.bincount([ alias.sample(rng) for i in range(50000) ], minlength=len(self.weights))
+        np.testing.assert_allclose(counts / 50000, expected, atol=0.01)
+
+    def test_zero_weights_pick_first_index(self):
+        rng = RandomStream(3)
+        for sampler in [PrefixSampler([0, 0, 0]), AliasSampler([0, 0, 0])]:
+            self.assertEqual(set(sampler.sample(rng) for i in range(20)), set([0]))
+
+    def test_row_sampler_matches_prefix_sampler(self):
+        rows = [ self.weights, self.weights[::-1], [ 1 - w / 3.0 for w in self.weights ] ]
+        a, b = pyrandom.Random(5), pyrandom.Random(5)
+        sampler = PrefixRowSampler(rows)
+        for i in range(3000):
+            self.assertEqual(sampler.sample(i % 3, a), PrefixSampler(rows[i % 3]).sample(b))
+
+    def test_uniform_indexes_match_choice(self):
+        population = list(range(7))
+        a, b = pyrandom.Random(2), pyrandom.Random(2)
+        indexes = uniform_indexes(len(population), (5, 2), a)
+        self.assertEqual(indexes.shape, (5, 2))
+        self.assertEqual(indexes.ravel().tolist(), [ b.choice(population) for i in range(10) ])
+
+    def test_weighted_rows(self):
+        weights = [[0, 0, 1, 0], [1, 0, 0, 0], [0, 0, 0, 2]]
+        self.assertEqual(weighted_rows(weights, RandomStream(1)).tolist(), [2, 0, 3])
@@ -0,0 +1,32 @@
+import unittest
+from evaluator.union_find import RoomUnionFind
+
+
+class RoomUnionFindTestCase(unittest.TestCase):
+
+    def test_union_and_islands(self):
+        forest = RoomUnionFind(6)
+        self.assertEqual(forest.largest, 1)
+        self.assertTrue(forest.union(0, 1))
+        self.assertTrue(forest.union(2, 3))
+        self.assertTrue(forest.union(1, 3))
+        self.assertFalse(forest.union(0, 2))
+        self.assertEqual(forest.largest, 4)
+        self.assertEqual(sorted(map(sorted, forest.islands())), [[0, 1, 2, 3], [4], [5]])
+
+    def test_rollback(self):
+        forest = RoomUnionFind(5)
+        forest.union(0, 1)
+        mark = forest.mark()
+        forest.union(1, 2)
+        forest.union(0, 2)
+        forest.union(3, 4)
+        self.assertEqual(forest.largest, 3)
+
+        forest.rollback(mark)
+        self.assertEqual(forest.largest, 2)
+        self.assertEqual(sorted(map(sorted, forest.islands())), [[0, 1], [2], [3], [4]])
+
+        self.assertEqual(forest.largest_with(1, 2), 3)
+        self.assertEqual(forest.largest, 2)
+        self.assertEqual(forest.mark(), mark)
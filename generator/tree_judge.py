@@ -1,15 +1,25 @@
 import generator.subdivide_tree_generator
 from generator.groom import LivingGroom, BedGroom, BathGroom
 import itertools
-from generator.genetic_tree_shaker import GeneticTreeShaker
+from generator.genetic_tree_shaker import GenomeTreeShaker
 from generator.subdivide_tree_generator import *
 from generator.groom import *
 import renderer.svgrenderer
 from generator.genetic_door_shaker import GeneticDoorShaker
 from evaluator.door_judge import DoorJudge
+from evaluator.batch_door_judge import BatchDoorJudge
 from generator.random_door_generator import RandomDoorGenerator
+from generator.rectangle_plan import RectangleTreeToFloorplan
+from generator.batch_evaluator import BatchTreeEvaluator
+from generator.scoring_pool import TreeScoringPool
+from generator.fitness_cache import FitnessCache
+from generator.door_bits import DoorScoreCache
+from generator.door_edges import DoorEdgeIndex
+from bakedrandom import brandom, RandomStream
 from recordclass import recordclass
 import pickle
+import time
+import os
 
 FloorplanDNA = recordclass('FloorplanDNA', [
     'list_o_rooms',
@@ -19,6 +29,17 @@ FloorplanDNA = recordclass('FloorplanDNA', [
     'door_vector',
 ])
 
+SearchProgress = recordclass('SearchProgress', [
+    'phase',
+    'score',
+    'rootnode',
+    'floorplan',
+    'door_vector',
+    'door_score',
+    'elapsed',
+    'evaluations',
+])
+
 def save_floorplan(dna, fp, filename):
     with open(filename + ".pickle", 'wb') as f:
         pickle.dump(dna, f)
@@ -29,6 +50,56 @@ def load_floorplan(filename):
         return dna
 
 
+class DnaStore(object):
+
+    # Saved plans for labelled pairs. The same plan shows up in many pairs,
+    # so each pickle is read once and each tree instantiated once; pairs that
+    # share a plan share its FloorPlan. Plans are keyed by id, the file name
+    # without directory or extension, and files maps ids to pickle paths; an
+    # id found in two directories is an error rather than a silent alias.
+
+    def __init__(self, weights=None):
+        self.weights = weights or default_tree_weights
+        self.files = {}
+        self.dnas = {}
+        self.floorplans = {}
+
+    @staticmethod
+    def plan_id(filename):
+        name = os.path.basename(filename)
+        for extension in (".svg", ".pickle"):
+            if name.endswith(extension):
+                name = name[:-len(extension)]
+        return name
+
+    def add(self, filename):
+        plan_id = DnaStore.plan_id(filename)
+        path = os.path.abspath(os.path.join(os.path.dirname(filename), plan_id))
+        if self.files.setdefault(plan_id, path) != path:
+            raise ValueError("Plan {} is both {} and {}".format(plan_id, self.files[plan_id], path))
+        return plan_id
+
+    def add_directory(self, directory):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".pickle"):
+                self.add(os.path.join(directory, name))
+
+    def dna(self, plan_id):
+        if plan_id not in self.dnas:
+            self.dnas[plan_id] = load_floorplan(self.files[plan_id])
+        return self.dnas[plan_id]
+
+    def floorplan(self, plan_id):
+        if plan_id not in self.floorplans:
+            dna = self.dna(plan_id)
+            instantiator = SubdivideTreeToFloorplan(dna.width, dna.height, dna.list_o_rooms, TreeWeights(**self.weights))
+            self.floorplans[plan_id] = instantiator.generate_candidate_floorplan(dna.rootnode)
+        return self.floorplans[plan_id]
+
+    def get(self, filename):
+        return self.floorplan(self.add(filename))
+
+
 class FloorplanEvaluator(object):
 
     def __init__(self, weights):
@@ -55,20 +126,74 @@ class FloorplanEvaluator(object):
 
 
 class GeneratorParams(object):
-    def __init__(self, width=120, height=80, weights=TreeWeights(**default_tree_weights), num_generations = 5, inner_iter = 10, door_iter = 200):
+    def __init__(self, width=120, height=80, weights=TreeWeights(**default_tree_weights), num_generations = 5, inner_iter = 10, door_iter = 200, processes = 1, islands = 1, migration_interval = 5, seed = None):
         self.width = width
         self.height = height
         self.weights = weights
         self.num_generations = num_generations
         self.inner_iter = inner_iter
         self.door_iter = door_iter
+        self.processes = processes
+        self.islands = islands
+        self.migration_interval = migration_interval
+        # With a seed, every restart, island and door search gets its own
+        # RandomStream spawned from it; without one they all share brandom
+        self.seed = seed
+
+
+
+class SearchBudget(object):
+
+    # Wall-clock and/or evaluation budget for PopulationCentrifuge.search. The
+    # tree GA may use (1 - door_share) of it, the door GA gets the rest plus
+    # whatever the tree GA left over. Budgets are checked between
+    # generations, so a search overshoots by at most one generation.
+
+    def __init__(self, seconds=None, evaluations=None, door_share=0.25, clock=time.monotonic):
+        self.seconds = seconds
+        self.evaluations = evaluations
+        self.door_share = door_share
+        self.clock = clock
+        self.started = None
+        self.used = 0
+
+    def start(self):
+        self.started = self.clock()
+        self.used = 0
+
+    @property
+    def elapsed(self):
+        return self.clock() - self.started
+
+    def charge(self, evaluations):
+        self.used += evaluations
+
+    def exhausted(self, share=1.0):
+        if self.seconds is not None and self.elapsed >= self.seconds * share:
+            return True
+        if self.evaluations is not None and self.used >= self.evaluations * share:
+            return True
+        return False
 
+    @property
+    def tree_exhausted(self):
+        return self.exhausted(1 - self.door_share)
+
+    @property
+    def door_exhausted(self):
+        return self.exhausted()
 
 
 class PopulationCentrifuge(object):
 
     def __init__(self, gparams=GeneratorParams()):
         self.gparams = gparams
+        self.rng = brandom if gparams.seed is None else RandomStream(gparams.seed)
+
+    def spawn_rngs(self, n):
+        if isinstance(self.rng, RandomStream):
+            return self.rng.spawn(n)
+        return [ self.rng ] * n
 
 
     def dump_plan(self, fp, door_vector, generation_num, list_o_rooms, width, height, rootnode):
@@ -91,7 +216,36 @@ class PopulationCentrifuge(object):
         ren.render(filename + '.svg')
 
 
+    def create_list_o_rooms(self):
+        # list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.9)]
+        # list_o_rooms = []
+        # list_o_rooms += [ BedGroom(1.9) ] * 71
+        # list_o_rooms += [ LivingGroom(4.0) ] * 20
+        # list_o_rooms += [ DiningGroom(2.5) ] * 20
+        # list_o_rooms += [ CustomGroom(1.5, "Breakfast", "d3dfb8") ] * 15
+        # list_o_rooms += [ CustomGroom(1.5, "Snacking", "f7a9a8") ] * 15
+        # list_o_rooms += [ CustomGroom(1.5, "Standing", "717ec3") ] * 20
+        # list_o_rooms += [ CustomGroom(5.0, "Ballroom", "b79ab7") ] * 10
+        # list_o_rooms += [ BathGroom(1.0) ] * 20
+        # list_o_rooms += [ KitchenGroom(2.0) ] * 20
+        # list_o_rooms += [ CustomGroom(1.33, "No Purpose", "f7e1d7") ] * 30
+
+        list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(1.8), BedGroom(2.0), BathGroom(1), BathGroom(1)]
+        return list(itertools.chain(list_o_rooms*1))
+
+    def create_door_vector(self, fp, rng=None):
+        rng = rng or self.rng
+        door_index = DoorEdgeIndex(fp)
+        shaker = GeneticDoorShaker(fp, [ RandomDoorGenerator.create_door_vector(len(door_index), rng) for i in range(20)], rng=rng,
+            batch_judge=BatchDoorJudge(fp), door_cache=DoorScoreCache(), door_index=door_index)
+        for j in range(self.gparams.door_iter):
+            shaker.run_generation()
+        return shaker.best_vector
+
     def create_perfect_floorplan(self):
+        if self.gparams.islands > 1:
+            return self.create_island_floorplan()
+
         max_score = float('-inf')
         best_plan = None
 
@@ -99,84 +253,221 @@ class PopulationCentrifuge(object):
         height = self.gparams.height
         weights = self.gparams.weights
 
-        for generation in range(self.gparams.num_generations):
-            print("  -> Evaluating generation ", generation)
-
-            # list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.9)]
-            # list_o_rooms = []
-            # list_o_rooms += [ BedGroom(1.9) ] * 71
-            # list_o_rooms += [ LivingGroom(4.0) ] * 20
-            # list_o_rooms += [ DiningGroom(2.5) ] * 20
-            # list_o_rooms += [ CustomGroom(1.5, "Breakfast", "d3dfb8") ] * 15
-            # list_o_rooms += [ CustomGroom(1.5, "Snacking", "f7a9a8") ] * 15
-            # list_o_rooms += [ CustomGroom(1.5, "Standing", "717ec3") ] * 20
-            # list_o_rooms += [ CustomGroom(5.0, "Ballroom", "b79ab7") ] * 10
-            # list_o_rooms += [ BathGroom(1.0) ] * 20
-            # list_o_rooms += [ KitchenGroom(2.0) ] * 20
-            # list_o_rooms += [ CustomGroom(1.33, "No Purpose", "f7e1d7") ] * 30
-
-            list_o_rooms = [LivingGroom(4), DiningGroom(2.5), KitchenGroom(2), BedGroom(1.8), BedGroom(1.8), BedGroom(2.0), BathGroom(1), BathGroom(1)]
-            list_o_rooms = list(itertools.chain(list_o_rooms*1))
-
-            adam = SubdivideTreeGenerator().generate_tree_from_indexes(
-                range(len(list_o_rooms))
-            )
+        list_o_rooms = self.create_list_o_rooms()
+
+        # Rooms are the same every generation, so candidates of the whole run
+        # can be scored by one persistent pool
+        if self.gparams.processes > 1:
+            scorer = TreeScoringPool(width, height, list_o_rooms, weights, self.gparams.processes)
+        else:
+            scorer = BatchTreeEvaluator(width, height, list_o_rooms, weights)
+        fitness_cache = FitnessCache()
+
+        try:
+            for generation, rng in enumerate(self.spawn_rngs(self.gparams.num_generations)):
+                print("  -> Evaluating generation ", generation)
+
+                adam = SubdivideTreeGenerator(rng).generate_tree_from_indexes(
+                    range(len(list_o_rooms))
+                )
+
+                # Candidates are scored on their rectangle form; a FloorPlan is
+                # only built for plans that get doors
+                instantiator = RectangleTreeToFloorplan(width, height, list_o_rooms, weights)
+
+                salt = GenomeTreeShaker(
+                    adam,
+                    list_o_rooms,
+                    instantiator,
+                    FloorplanEvaluator(weights),
+                    batch_evaluator=scorer,
+                    fitness_cache=fitness_cache,
+                    rng=rng,
+                )
+
+                duplicate_score = 0
+                max_score = 0
+                for i in range(self.gparams.inner_iter):
+                    salt.run_generation()
+                    import statistics
+                    print("Inner iteration {} -- best score so far is {}".format(i,max([tree.score for tree in salt.population])))
+
+                    # Check the doors
+                    composite_score = salt.population[0].score
+
+                    if composite_score == max_score:
+                        duplicate_score += 1
+                    else:
+                        duplicate_score = 0
+
+                    if duplicate_score >= 12:
+                        break
+
+                    if composite_score > max_score:
+                        import uuid
+                        fp = instantiator.generate_candidate_floorplan(salt.population[0].to_node()).to_floorplan()
+                        door_vector = self.create_door_vector(fp, rng)
+                        best_plan = fp, door_vector
+                        max_score = composite_score
+
+
+                # self.dump_plan(
+                #     best_plan[0],
+                #     door_vector,
+                #     str(generation),
+                #     list_o_rooms,
+                #     width, height,
+                #     salt.population[0].to_node(),
+                # )
+
+
+                    # renderer.svgrenderer.SvgRenderer(fp).render('out/output.svg')
+        finally:
+            if isinstance(scorer, TreeScoringPool):
+                scorer.close()
+
+        print("Max score was", max_score)
+        print("Fitness cache hit rate {:.2f} ({} hits, {} misses)".format(fitness_cache.hit_rate, fitness_cache.hits, fitness_cache.misses))
+
+        fp, vector = best_plan
+        fp.clear_doors()
+        fp.add_doors(vector, self.rng)
+
+        return fp
+
+    def create_island_floorplan(self):
+        # Island model instead of sequential restarts: the populations evolve
+        # in parallel from one tree shape and exchange their best members
+        from generator.islands import IslandModel
+
+        width = self.gparams.width
+        height = self.gparams.height
+        weights = self.gparams.weights
+        list_o_rooms = self.create_list_o_rooms()
+
+        adam = SubdivideTreeGenerator(self.rng).generate_tree_from_indexes(
+            range(len(list_o_rooms))
+        )
+        islands = IslandModel(
+            adam,
+            list_o_rooms,
+            width,
+            height,
+            weights,
+            num_islands=self.gparams.islands,
+            num_migrations=self.gparams.inner_iter,
+            generations_per_migration=self.gparams.migration_interval,
+            rng=self.rng,
+        )
+        best = islands.run()
+
+        instantiator = RectangleTreeToFloorplan(width, height, list_o_rooms, weights)
+        fp = instantiator.generate_candidate_floorplan(best.to_node()).to_floorplan()
+        door_vector = self.create_door_vector(fp)
+
+        print("Max score was", best.score)
+
+        fp.clear_doors()
+        fp.add_doors(door_vector, self.rng)
+
+        return fp
+
+    def search(self, budget, patience=12, door_patience=30):
+        # Anytime version of create_perfect_floorplan. Yields a SearchProgress
+        # whenever the best plan improves: 'tree' ones have no doors yet,
+        # 'doors' ones carry the best door vector so far. The last one, with
+        # phase 'done', is the result. The yielded floorplan is shared with
+        # the door GA, so apply door_vector to it rather than rely on its doors.
+        # A search that scores no tree, such as one with no budget, yields
+        # nothing.
+        budget.start()
+
+        width = self.gparams.width
+        height = self.gparams.height
+        weights = self.gparams.weights
+        list_o_rooms = self.create_list_o_rooms()
 
-            instantiator = SubdivideTreeToFloorplan(width, height, list_o_rooms, weights)
+        scorer = BatchTreeEvaluator(width, height, list_o_rooms, weights)
+        fitness_cache = FitnessCache()
+        instantiator = RectangleTreeToFloorplan(width, height, list_o_rooms, weights)
 
-            salt = GeneticTreeShaker(
+        best = None
+        for generation, rng in enumerate(self.spawn_rngs(self.gparams.num_generations)):
+            if budget.tree_exhausted:
+                break
+
+            adam = SubdivideTreeGenerator(rng).generate_tree_from_indexes(
+                range(len(list_o_rooms))
+            )
+            salt = GenomeTreeShaker(
                 adam,
                 list_o_rooms,
                 instantiator,
                 FloorplanEvaluator(weights),
+                batch_evaluator=scorer,
+                fitness_cache=fitness_cache,
+                rng=rng,
             )
 
-            duplicate_score = 0
-            max_score = 0
+            # A restart ends when its best stops improving for `patience`
+            # generations
+            stalled = 0
+            restart_score = None
             for i in range(self.gparams.inner_iter):
                 salt.run_generation()
-                import statistics
-                print("Inner iteration {} -- best score so far is {}".format(i,max([tree.score for tree in salt.population])))
-
-                fp = instantiator.generate_candidate_floorplan(salt.population[0])
+                budget.charge(salt.num_crossovers)
 
-                # Check the doors
-                composite_score = salt.population[0].score
+                score = salt.population[0].score
+                stalled = stalled + 1 if score == restart_score else 0
+                restart_score = score
 
-                if composite_score == max_score:
-                    duplicate_score += 1
-                else:
-                    duplicate_score = 0
+                if best is None or score > best.score:
+                    best = salt.population[0].copy()
+                    rootnode = best.to_node()
+                    fp = instantiator.generate_candidate_floorplan(rootnode).to_floorplan()
+                    yield SearchProgress('tree', best.score, rootnode, fp, None, None, budget.elapsed, budget.used)
 
-                if duplicate_score >= 12:
+                if stalled >= patience or budget.tree_exhausted:
                     break
 
-                if composite_score > max_score:
-                    import uuid
-                    shaker = GeneticDoorShaker(fp, [ RandomDoorGenerator.create_door_vector(len(fp.edges)) for i in range(20)])
-                    for j in range(self.gparams.door_iter):
-                        shaker.run_generation()
-                    door_vector = shaker.population[0].vector
-                    best_plan = fp, door_vector
-                    max_score = composite_score
-
-
-            # self.dump_plan(
-            #     best_plan[0],
-            #     door_vector,
-            #     str(generation),
-            #     list_o_rooms,
-            #     width, height,
-            #     salt.population[0],
-            # )
-
+        if best is None:
+            return
+
+        rootnode = best.to_node()
+        fp = instantiator.generate_candidate_floorplan(rootnode).to_floorplan()
+        door_rng = self.spawn_rngs(1)[0]
+        door_index = DoorEdgeIndex(fp)
+        shaker = GeneticDoorShaker(fp, [ RandomDoorGenerator.create_door_vector(len(door_index), door_rng) for i in range(20)], rng=door_rng,
+            batch_judge=BatchDoorJudge(fp), door_cache=DoorScoreCache(), door_index=door_index)
+
+        door_score = None
+        stalled = 0
+        for j in range(self.gparams.door_iter):
+            if budget.door_exhausted or stalled >= door_patience:
+                break
+            shaker.run_generation()
+            budget.charge(shaker.num_crossovers)
+
+            if door_score is None or shaker.population[0].score > door_score:
+                door_score = shaker.population[0].score
+                stalled = 0
+                yield SearchProgress('doors', best.score, rootnode, fp, shaker.best_vector, door_score, budget.elapsed, budget.used)
+            else:
+                stalled += 1
+
+        door_vector = shaker.best_vector
+        fp.clear_doors()
+        fp.add_doors(door_vector, door_rng)
+        yield SearchProgress('done', best.score, rootnode, fp, door_vector, door_score, budget.elapsed, budget.used)
 
-                # renderer.svgrenderer.SvgRenderer(fp).render('out/output.svg')
+    def create_budgeted_floorplan(self, budget, callback=None, **kwargs):
+        progress = None
+        for progress in self.search(budget, **kwargs):
+            if callback is not None:
+                callback(progress)
 
-        print("Max score was", max_score)
+        if progress is None:
+            return None
 
-        fp, vector = best_plan
-        fp.clear_doors()
-        fp.add_doors(vector)
-
-        return fp
+        print("Max score was", progress.score)
+        return progress.floorplan
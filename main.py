@@ -10,10 +10,11 @@ from evaluator.basic_evals import *
 from generator.genetic_tree_shaker import GeneticTreeShaker
 from generator.subdivide_tree_generator import *
 from generator.groom import *
-from generator.tree_judge import PopulationCentrifuge, load_floorplan, FloorplanEvaluator
+from generator.tree_judge import PopulationCentrifuge, DnaStore, FloorplanEvaluator
 from generator.random_door_generator import RandomDoorGenerator
 from generator.genetic_door_shaker import GeneticDoorShaker
 from generator.genetic_weight_frobber import GeneticWeightFrobber
+from generator.checkpoint import Checkpointer
 from evaluator.door_judge import DoorJudge
 from bakedrandom import brandom as random
 import statistics
@@ -30,14 +31,15 @@ def garbage_fire():
     print('-- Labels -- ')
     print(labels)
 
-def get_floorplan(unfixed_filename):
-    dna = load_floorplan("." + unfixed_filename.replace(".svg", ""))
-    instantiator = SubdivideTreeToFloorplan(dna.width, dna.height, dna.list_o_rooms, TreeWeights(**default_tree_weights))
-    fp = instantiator.generate_candidate_floorplan(dna.rootnode)
-    return fp
+# Plans named in scores.txt, loaded once however many pairs they are in
+dna_store = DnaStore()
 
 
-def autofrob_tree_evaluator_weights():
+def get_floorplan(unfixed_filename, store=dna_store):
+    return store.get("." + unfixed_filename)
+
+
+def autofrob_tree_evaluator_weights(checkpoint_filename="./out/frob-checkpoint.pickle.gz"):
 
     floorplan_pairs = []
 
@@ -53,10 +55,19 @@ def autofrob_tree_evaluator_weights():
         floorplan_pairs
     )
 
-    for i in range(10000):
-        print("Running a generation", i)
-        frobber.run_generation()
-        print(frobber.population[0])
+    # Picks up where a previous run stopped if it left a checkpoint
+    checkpointer = Checkpointer(checkpoint_filename, every=10)
+    if checkpointer.resume(frobber):
+        print("Resuming from generation", frobber.generation)
+
+    try:
+        for i in range(frobber.generation, 10000):
+            print("Running a generation", i)
+            frobber.run_generation()
+            print(frobber.population[0])
+            checkpointer.after_generation(frobber)
+    finally:
+        frobber.close()
 
 
 def manual_score():
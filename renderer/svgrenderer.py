@@ -43,17 +43,14 @@ class SvgRenderer(object):
         print("We are outputting svg to ", filename)
         self.render_connectivity_graph()
 
-        edges = set()
         for room in self.floorplan.rooms:
             self.render_room_fill(room)
-            for edge in room.edges:
-                positive_groom = edge.positive.groom if edge.positive is not None else None
-                negative_groom = edge.negative.groom if edge.negative is not None else None
-                if type(positive_groom) is HallwayGroom and type(negative_groom) is HallwayGroom:
-                    continue
-                edges.add(edge)
-
-        for edge in edges:
+
+        for edge in self.floorplan.edges:
+            positive_groom = edge.positive.groom if edge.positive is not None else None
+            negative_groom = edge.negative.groom if edge.negative is not None else None
+            if type(positive_groom) is HallwayGroom and type(negative_groom) is HallwayGroom:
+                continue
             self.render_edge(edge)
 
         if show_edge_connections: